@@ -1,6 +1,43 @@
 # AST repr parser: parse Cangjie compiler AST text repr and emit desugared Cangjie.
+# Submodules are imported on first attribute access, so callers that only parse never load codegen.
 
-from .parser import parse_ast_repr, ASTNode
-from .codegen import ast_to_cangjie
+# typing is not imported here: it costs as much as the rest of a bare `import ast_repr_parser`.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, List
 
-__all__ = ["parse_ast_repr", "ASTNode", "ast_to_cangjie"]
+    from .parser import parse_ast_repr, parse_ast_package, parse_ast_stream, ASTNode
+    from .codegen import ast_to_cangjie, ast_to_cangjie_files, iter_cangjie, iter_cangjie_stream, write_cangjie, register_emitter
+    from .index import open_ast
+    from .cache import parse_ast_repr_cached
+
+_EXPORTS = {
+    "parse_ast_repr": "parser",
+    "parse_ast_package": "parser",
+    "parse_ast_stream": "parser",
+    "ASTNode": "parser",
+    "ast_to_cangjie": "codegen",
+    "ast_to_cangjie_files": "codegen",
+    "iter_cangjie": "codegen",
+    "iter_cangjie_stream": "codegen",
+    "write_cangjie": "codegen",
+    "register_emitter": "codegen",
+    "open_ast": "index",
+    "parse_ast_repr_cached": "cache",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> "Any":
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> "List[str]":
+    return sorted(set(globals()) | set(__all__))
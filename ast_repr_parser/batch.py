@@ -0,0 +1,230 @@
+"""
+Batch conversion of many dumps: expand files, directories and globs, convert each dump in a process pool,
+and write the results under an output directory with mirrored relative paths.
+A manifest of input/output hashes and options lets reruns skip dumps that did not change.
+"""
+
+import glob
+import hashlib
+import marshal
+import os
+import time
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .codegen import write_cangjie
+from .parser import parse_ast_repr
+
+DEFAULT_PATTERN = "*.txt"
+OUTPUT_SUFFIX = ".cj"
+
+# Bump when codegen changes, so outputs recorded by an older version are regenerated.
+MANIFEST_VERSION = 1
+_MANIFEST_FORMAT = "cjmanifest"
+
+
+class BatchResult(NamedTuple):
+    """Outcome of converting one dump; `error` is set (and `output` not written) when it failed."""
+    input: str
+    output: str
+    size: int
+    seconds: float
+    error: Optional[str] = None
+    skipped: bool = False
+    input_digest: Optional[str] = None
+    output_digest: Optional[str] = None
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Manifest:
+    """Record of the last successful conversion of each dump, for skipping unchanged ones.
+
+    Entries map the absolute dump path to the options, output path, and the size, mtime and
+    content hash of both the dump and the output. A dump is current when the options and output
+    path match and both files still have the recorded content. Matching size and mtime are taken
+    as unchanged content; otherwise the file is hashed, so a touched but identical dump is still
+    skipped. The file is ignored if missing, unreadable or written by another version.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, tuple] = {}
+        try:
+            with open(path, "rb") as f:
+                fmt, version, entries = marshal.load(f)
+        except (OSError, ValueError, EOFError, TypeError):
+            return
+        if (fmt, version) == (_MANIFEST_FORMAT, MANIFEST_VERSION):
+            self.entries = entries
+
+    @staticmethod
+    def _options_key(options: dict) -> tuple:
+        return tuple(sorted(options.items()))
+
+    @staticmethod
+    def _matches(path: str, size: int, mtime_ns: int, digest: str) -> bool:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if (st.st_size, st.st_mtime_ns) == (size, mtime_ns):
+            return True
+        return st.st_size == size and file_digest(path) == digest
+
+    def is_current(self, path: str, output: str, options: dict) -> bool:
+        entry = self.entries.get(os.path.abspath(path))
+        if entry is None:
+            return False
+        opts, out, in_stat, out_stat = entry
+        if opts != self._options_key(options) or out != os.path.abspath(output):
+            return False
+        if not (self._matches(path, *in_stat) and self._matches(output, *out_stat)):
+            return False
+        # Refresh the stats, so a touched dump is hashed only once
+        self._stat_entry(path, output, options, in_stat[2], out_stat[2])
+        return True
+
+    def _stat_entry(self, path: str, output: str, options: dict, input_digest: str, output_digest: str) -> None:
+        ist, ost = os.stat(path), os.stat(output)
+        self.entries[os.path.abspath(path)] = (
+            self._options_key(options),
+            os.path.abspath(output),
+            (ist.st_size, ist.st_mtime_ns, input_digest),
+            (ost.st_size, ost.st_mtime_ns, output_digest),
+        )
+
+    def record(self, result: BatchResult, options: dict) -> None:
+        """Store a converted dump (with digests), or forget a failed one so it is retried."""
+        if result.error or result.input_digest is None:
+            self.entries.pop(os.path.abspath(result.input), None)
+            return
+        try:
+            self._stat_entry(result.input, result.output, options, result.input_digest, result.output_digest)
+        except OSError:
+            self.entries.pop(os.path.abspath(result.input), None)
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            marshal.dump((_MANIFEST_FORMAT, MANIFEST_VERSION, self.entries), f)
+        os.replace(tmp, self.path)
+
+
+def expand_inputs(inputs: Iterable[str], pattern: str = DEFAULT_PATTERN) -> List[Tuple[str, str]]:
+    """(dump path, relative output path) for every dump named by `inputs`, in a stable order.
+
+    Directories are searched recursively for files matching `pattern` and mirrored relative to the
+    directory; files and glob matches are mirrored relative to the deepest directory containing all
+    of them. Output paths take OUTPUT_SUFFIX in place of the dump's extension.
+    """
+    found: List[Tuple[str, Optional[str]]] = []
+    for arg in inputs:
+        if os.path.isdir(arg):
+            matches = sorted(glob.glob(os.path.join(glob.escape(arg), "**", pattern), recursive=True))
+            found.extend((p, arg) for p in matches if os.path.isfile(p))
+        elif os.path.isfile(arg):
+            found.append((arg, None))
+        elif glob.has_magic(arg):
+            matches = [p for p in sorted(glob.glob(arg, recursive=True)) if os.path.isfile(p)]
+            if not matches:
+                raise FileNotFoundError(f"No files match: {arg}")
+            found.extend((p, None) for p in matches)
+        else:
+            raise FileNotFoundError(f"File not found: {arg}")
+    loose = [os.path.dirname(os.path.abspath(p)) for p, base in found if base is None]
+    common = os.path.commonpath(loose) if loose else ""
+    jobs = []
+    seen = {}
+    for path, base in found:
+        rel = os.path.relpath(os.path.abspath(path), os.path.abspath(base) if base else common)
+        rel = os.path.splitext(rel)[0] + OUTPUT_SUFFIX
+        if rel in seen:
+            if os.path.samefile(seen[rel], path):
+                continue
+            raise ValueError(f"{seen[rel]} and {path} would both be written to {rel}")
+        seen[rel] = path
+        jobs.append((path, rel))
+    return jobs
+
+
+def convert_file(path: str, output: str, digest: bool = False, **options) -> BatchResult:
+    """Convert the dump at `path` to `output` with write_cangjie(**options), creating parent directories.
+
+    Errors are returned in the result instead of raised, so one bad dump does not stop a batch.
+    With digest, the result carries the content hashes of the dump and the output (for a Manifest).
+    """
+    t0 = time.perf_counter()
+    tmp = f"{output}.{os.getpid()}.tmp"
+    input_digest = output_digest = None
+    try:
+        size = os.path.getsize(path)
+        if digest:
+            input_digest = file_digest(path)
+        root = parse_ast_repr(path)
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            write_cangjie(root, f, **options)
+        if digest:
+            output_digest = file_digest(tmp)
+        os.replace(tmp, output)
+    except Exception as e:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return BatchResult(path, output, 0, time.perf_counter() - t0, f"{type(e).__name__}: {e}")
+    return BatchResult(path, output, size, time.perf_counter() - t0, None, False, input_digest, output_digest)
+
+
+def _convert_job(job: Tuple[str, str, bool, dict]) -> BatchResult:
+    return convert_file(job[0], job[1], job[2], **job[3])
+
+
+def _convert_tasks(tasks: List[tuple], workers: int) -> Iterator[BatchResult]:
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield _convert_job(task)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    # Small chunks keep workers balanced when dump sizes vary; not 1, so tiny dumps don't pay per-task IPC
+    chunksize = max(1, min(16, len(tasks) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        yield from pool.map(_convert_job, tasks, chunksize=chunksize)
+
+
+def convert_many(
+    jobs: List[Tuple[str, str]],
+    out_dir: str,
+    workers: int = 1,
+    manifest: Optional[Manifest] = None,
+    **options,
+) -> Iterator[BatchResult]:
+    """Convert (dump path, relative output path) jobs from expand_inputs into `out_dir`.
+
+    With workers > 1 the dumps are converted in a process pool, each dump by a single worker;
+    results are yielded in job order as they become available. With a manifest, dumps it lists
+    as current are not converted (their results have skipped=True), the others are recorded,
+    and the manifest is saved when the generator finishes or is closed.
+    """
+    tasks = [(path, os.path.join(out_dir, rel), manifest is not None, options) for path, rel in jobs]
+    if manifest is None:
+        yield from _convert_tasks(tasks, workers)
+        return
+    current = [manifest.is_current(path, output, options) for path, output, _, _ in tasks]
+    converted = _convert_tasks([t for t, skip in zip(tasks, current) if not skip], workers)
+    try:
+        for (path, output, _, _), skip in zip(tasks, current):
+            if skip:
+                yield BatchResult(path, output, 0, 0.0, skipped=True)
+                continue
+            result = next(converted)
+            manifest.record(result, options)
+            yield result
+    finally:
+        converted.close()
+        manifest.save()
@@ -0,0 +1,126 @@
+"""
+On-disk cache of parsed ASTs, keyed by dump content (or size+mtime).
+Entries are `serialize.dumps_tree` blobs; the directory is kept under a byte budget by evicting least recently used entries.
+"""
+
+import hashlib
+import os
+from typing import Optional, Union
+
+from .parser import ASTNode, parse_ast_repr
+from .serialize import dumps_tree, loads_tree
+
+# Bump when the parser or the serialization format changes what a cached tree would contain.
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 1 << 30
+_SUFFIX = ".astc"
+
+
+def default_cache_dir() -> str:
+    """`$AST_REPR_CACHE_DIR`, else `$XDG_CACHE_HOME/ast_repr_parser` (default `~/.cache/ast_repr_parser`)."""
+    env = os.environ.get("AST_REPR_CACHE_DIR")
+    if env:
+        return env
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ast_repr_parser")
+
+
+class ParseCache:
+    """Directory of cached parse results.
+
+    key="content" hashes the dump bytes (robust, costs one read); key="stat" hashes the absolute
+    path, size and mtime instead (no read, but trusts mtimes).
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES, key: str = "content"):
+        if key not in ("content", "stat"):
+            raise ValueError(f"key must be 'content' or 'stat', got {key!r}")
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.key = key
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, path: Union[str, "os.PathLike[str]"]) -> str:
+        h = hashlib.sha256(f"ast_repr_parser/{CACHE_VERSION}/{self.key}\0".encode())
+        if self.key == "stat":
+            st = os.stat(path)
+            h.update(f"{os.path.abspath(path)}\0{st.st_size}\0{st.st_mtime_ns}".encode())
+        else:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+        return h.hexdigest()
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key: str) -> Optional[ASTNode]:
+        entry = self._entry(key)
+        try:
+            with open(entry, "rb") as f:
+                data = f.read()
+            root = loads_tree(data)
+        except (OSError, ValueError, EOFError, TypeError):
+            return None
+        try:
+            os.utime(entry)  # mark as recently used
+        except OSError:
+            pass
+        return root
+
+    def put(self, key: str, root: ASTNode) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        entry = self._entry(key)
+        tmp = f"{entry}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(dumps_tree(root))
+        os.replace(tmp, entry)
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the directory fits in max_bytes."""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for e in it:
+                if e.name.endswith(_SUFFIX):
+                    try:
+                        st = e.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime_ns, st.st_size, e.path))
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def parse(self, path: Union[str, "os.PathLike[str]"]) -> ASTNode:
+        """`parse_ast_repr(path)`, served from the cache when the dump was parsed before."""
+        key = self.key_for(path)
+        root = self.get(key)
+        if root is not None:
+            self.hits += 1
+            return root
+        self.misses += 1
+        root = parse_ast_repr(path)
+        try:
+            self.put(key, root)
+        except OSError:
+            pass  # unwritable cache: still return the parse
+        return root
+
+
+def parse_ast_repr_cached(
+    path: Union[str, "os.PathLike[str]"],
+    cache_dir: Optional[str] = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    key: str = "content",
+) -> ASTNode:
+    """Parse the dump at `path` through a ParseCache in `cache_dir` (see `default_cache_dir`)."""
+    return ParseCache(cache_dir, max_bytes=max_bytes, key=key).parse(path)
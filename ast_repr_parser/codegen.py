@@ -1,52 +1,216 @@
 """
 Emit desugared Cangjie source from parsed AST. Faithful to AST; no reverse-desugaring.
-Positions emitted as comments; unknown nodes as placeholders with info preserved.
+Positions emitted as comments (or collected into a source map); unknown nodes as placeholders with info preserved.
 """
 
-from typing import List, Any, Optional
-from .parser import ASTNode
+import io
+import sys
+from itertools import accumulate
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional, Sequence, TextIO, Union
+from .parser import ASTNode, LazyASTNode, _LazyPattern, _mmap_tokens, _parse_node_content
 
-# Known node types we can emit; others get a placeholder
-KNOWN_NODE_TYPES = {
-    "File", "PackageSpec", "ImportSpec", "ClassDecl", "ClassBody", "MainDecl",
-    "FuncDecl", "FuncBody", "FuncParamList", "FuncParam", "Block", "VarDecl",
-    "CallExpr", "BaseFunc", "RefExpr", "MemberAccess", "LitConstExpr",
-    "RefType", "PrimitiveType", "AssignExpr", "BinaryExpr", "IfExpr", "MatchExpr",
-    "MatchCase", "LambdaExpr", "TryExpr", "TryBlock", "Catch", "CatchPattern",
-    "CatchBlock", "ExceptTypePattern", "VarPattern", "WildcardPattern",
-    "ReturnExpr", "ThrowExpr", "FuncArg", "FinallyBlock", "TypePattern",
-}
+# Expression-like AssignExpr children, taken in order as the left and right operands
+_ASSIGN_OPERAND_TYPES = ("MemberAccess", "RefExpr", "CallExpr", "LitConstExpr", "Block")
+
+SOURCE_MAP_FORMAT = "cjmap 1"
+_NON_SPACE = _LazyPattern(r"\S")
 
 
-# Set by ast_to_cangjie(..., include_comments=...) so all emitters can skip position comments
-_INCLUDE_COMMENTS = True
-_SANITIZE_IDENTIFIERS = True
-_ROUND_TRIP = False
+class _SourceMark(str):
+    """Empty fragment standing in for a position comment when a source map is collected.
+
+    It joins as "" and is falsy like no comment at all, survives strip() (the strip methods return
+    it unchanged) and is copied with the surrounding fragments by extend().
+    """
+
+    __slots__ = ("position",)
 
+    def strip(self, chars: Optional[str] = None) -> str:
+        return self
 
-def _reindent(s: str, base_indent: str) -> str:
-    """Reindent a multi-line string: strip minimum leading whitespace from each line, then prepend base_indent."""
-    if not s or "\n" not in s:
-        return s
-    lines = s.split("\n")
-    min_spaces = min(
-        (len(line) - len(line.lstrip()) for line in lines if line.strip()),
-        default=0,
+    lstrip = rstrip = strip
+
+
+class Emitter:
+    """Output buffer and options of one codegen call, passed through all emitters.
+
+    Fragments are appended to one list and joined once at the end. Callers that trim or inspect a
+    child's output (strip, emptiness, a trailing ".init") work on the fragments written since a
+    mark() instead of re-splitting strings. Options live here rather than in module state, so
+    concurrent calls with different options do not interfere.
+
+    With a `source_map` list, position() writes a _SourceMark instead of a comment; flush() and
+    getvalue() resolve the marks to (line, column) of the text they precede and append
+    (line, column, position) entries, tracking where the flushed output has got to.
+
+    Emitters registered with register_emitter receive it as `out`; emit_expr, emit_stmt and
+    emit_block_body write child nodes through the built-in dispatch.
+    """
+
+    __slots__ = (
+        "parts", "include_comments", "sanitize_identifiers", "round_trip", "source_map", "line", "column",
     )
-    return "\n".join(base_indent + line[min_spaces:] for line in lines)
 
+    def __init__(
+        self,
+        include_comments: bool = True,
+        sanitize_identifiers: bool = False,
+        round_trip: bool = False,
+        source_map: Optional[list] = None,
+    ) -> None:
+        self.parts: List[str] = []
+        self.include_comments = include_comments
+        self.sanitize_identifiers = sanitize_identifiers
+        self.round_trip = round_trip
+        self.source_map = source_map
+        # 1-based line and 0-based column at the end of the output flushed so far
+        self.line = 1
+        self.column = 0
+
+    def write(self, s: str) -> None:
+        self.parts.append(s)
+
+    def indent(self, level: int) -> None:
+        if level:
+            self.parts.append("    " * level)
+
+    def mark(self) -> int:
+        return len(self.parts)
+
+    def is_empty(self, mark: int) -> bool:
+        """Whether no text was written since `mark`; stops at the first non-empty fragment."""
+        parts = self.parts
+        for i in range(mark, len(parts)):
+            if parts[i]:
+                return False
+        return True
+
+    def extend(self, frags: List[str]) -> None:
+        self.parts.extend(frags)
 
-def _position_comment(node: ASTNode) -> str:
-    if not _INCLUDE_COMMENTS:
-        return ""
-    pos = node.get_position()
-    if pos:
-        return f"// position: {pos}\n"
-    return ""
+    def truncate(self, mark: int) -> None:
+        """Drop the fragments written since `mark`."""
+        del self.parts[mark:]
+
+    def strip(self, mark: int) -> None:
+        """Strip surrounding whitespace from the text written since `mark`."""
+        parts = self.parts
+        for i in range(mark, len(parts)):
+            parts[i] = parts[i].lstrip()
+            if parts[i]:
+                break
+        for i in range(len(parts) - 1, mark - 1, -1):
+            parts[i] = parts[i].rstrip()
+            if parts[i]:
+                break
+
+    def rstrip_first_line(self, mark: int) -> None:
+        """Strip trailing whitespace from the first line written since `mark` if more lines follow it."""
+        parts = self.parts
+        for i in range(mark, len(parts)):
+            nl = parts[i].find("\n")
+            if nl < 0:
+                continue
+            head = parts[i][:nl].rstrip()
+            parts[i] = head + parts[i][nl:]
+            if not head:
+                for j in range(i - 1, mark - 1, -1):
+                    parts[j] = parts[j].rstrip()
+                    if parts[j]:
+                        break
+            return
 
+    def remove_suffix(self, mark: int, suffix: str) -> None:
+        """Drop `suffix` from the end of the text written since `mark`, if it ends with it."""
+        parts = self.parts
+        tail, i = "", len(parts)
+        while i > mark and len(tail) < len(suffix):
+            i -= 1
+            tail = parts[i] + tail
+        if tail.endswith(suffix):
+            parts[i:] = [p for p in parts[i:] if p.__class__ is _SourceMark] + [tail[: -len(suffix)]]
 
-def _sanitize_identifier(name: str) -> str:
-    if not _SANITIZE_IDENTIFIERS:
+    def position(self, node: ASTNode) -> None:
+        """Write the `// position: ...` comment of `node`, unless comments are off; with a source map, mark it instead."""
+        if self.source_map is not None:
+            pos = node.get_position()
+            if pos:
+                mark = _SourceMark()
+                mark.position = pos
+                self.parts.append(mark)
+            return
+        if not self.include_comments:
+            return
+        pos = node.get_position()
+        if pos:
+            self.parts.append(f"// position: {pos}\n")
+
+    def emit_expr(self, node: ASTNode, level: int) -> None:
+        _run(self, _emit_expr, node, level)
+
+    def emit_stmt(self, node: ASTNode, level: int) -> None:
+        _run(self, _emit_stmt, node, level)
+
+    def emit_block_body(self, block_node: ASTNode, level: int) -> None:
+        """Statements of `block_node` at `level`, one per line."""
+        _run(self, _emit_block_body, block_node, level)
+
+    def getvalue(self) -> str:
+        text = "".join(self.parts)
+        if self.source_map is not None:
+            self._map_marks(text)
+        return text
+
+    def flush(self) -> str:
+        """Return the text written so far and empty the buffer."""
+        text = self.getvalue()
+        self.parts.clear()
+        return text
+
+    def _map_marks(self, text: str) -> None:
+        """Append a source map entry per mark in the buffer (whose text is `text`) and advance past it.
+
+        A mark maps to the first non-whitespace character after it; marks at the same spot for the
+        same position (a statement and its expression) give one entry.
+        """
+        parts = self.parts
+        entries = self.source_map
+        # Offsets and mark indices come from C-level scans; the loop runs once per mark
+        kinds = list(map(type, parts))
+        offsets = list(accumulate(map(len, parts)))
+        index, search, count, rfind = kinds.index, _NON_SPACE.search, text.count, text.rfind
+        line, last, i = self.line, 0, -1
+        prev = entries[-1] if entries else None
+        for _ in range(kinds.count(_SourceMark)):
+            i = index(_SourceMark, i + 1)
+            m = search(text, offsets[i])
+            at = m.start() if m else len(text)
+            line += count("\n", last, at)
+            last = at
+            nl = rfind("\n", 0, at)
+            entry = (line, at - nl if nl >= 0 else self.column + at + 1, parts[i].position)
+            if entry != prev:
+                entries.append(entry)
+                prev = entry
+        self._advance(text)
+
+    def _advance(self, text: str) -> None:
+        nl = text.count("\n")
+        if nl:
+            self.line += nl
+            self.column = len(text) - text.rfind("\n") - 1
+        else:
+            self.column += len(text)
+
+    def splice(self, text: str, entries: List[tuple]) -> None:
+        """Account for `text` generated elsewhere with its own source map `entries` (lines counted from 1)."""
+        for ln, col, pos in entries:
+            self.source_map.append((ln + self.line - 1, col + self.column if ln == 1 else col, pos))
+        self._advance(text)
+
+
+def _sanitize_identifier(out: Emitter, name: str) -> str:
+    if not out.sanitize_identifiers:
         return name
     return name.replace("-", "__").replace("$", "dollar_")
 
@@ -70,290 +234,367 @@ def _emit_type(node: ASTNode) -> str:
     return "Unknown"
 
 
-def _emit_expr(node: ASTNode, indent: str) -> str:
-    """Emit expression node to Cangjie."""
-    pos = _position_comment(node)
-    if node.type == "RefExpr":
-        name = _sanitize_identifier(node.name.strip()) if node.name else "?"
-        return pos + indent + name
-    if node.type == "LitConstExpr":
-        # LitConstExpr: String "..." or Integer "0" or Unit "()"
-        kind = (node.name or node.props.get("ty", "")).strip()
-        value = (node.value or "").strip()
-        if "String" in kind or "string" in kind:
-            return pos + indent + (f'"{value}"' if value else '""')
-        if "Integer" in kind or "Int" in kind:
-            return pos + indent + (value if value else "0")
-        if "Bool" in kind:
-            return pos + indent + (value if value else "false")
-        if "Unit" in kind:
-            return pos + indent + (value if value else "()")
-        return pos + indent + (value if value else "()")
-    if node.type == "CallExpr":
-        base = ""
-        args_list = node.list_props.get("arguments", [])
-        for c in node.children:
-            if c.type == "BaseFunc":
-                base = _emit_base_func(c, indent)
+def _run(out: Emitter, emit: "EmitFn", node: ASTNode, level: int) -> None:
+    """Call `emit(out, node, level)` and carry out the child emissions it yields, on an explicit stack.
+
+    Emitters of nodes with children are generators yielding (emit, node, level) tasks. A task runs
+    to completion, its own tasks included, before the generator that yielded it resumes, so the
+    output is that of direct recursive calls while nesting depth costs stack entries instead of
+    Python frames. Plain emitters return None.
+    """
+    task = emit(out, node, level)
+    if task is None:
+        return
+    stack = [task]
+    push, pop = stack.append, stack.pop
+    while stack:
+        # Resumes the innermost generator; a break leaves it suspended after the task it yielded.
+        for emit, node, level in stack[-1]:
+            task = emit(out, node, level)
+            if task is not None:
+                push(task)
                 break
-        if not base:
-            for c in node.children:
-                if c.type == "MemberAccess":
-                    base = _emit_member_access(c, indent)
-                    break
-        if base.endswith(".init"):
-            base = base[:-5]
-        arg_strs = []
-        for fa in args_list:
-            if isinstance(fa, ASTNode):
-                for fc in fa.children:
-                    arg_strs.append(_emit_expr(fc, ""))
-                if not fa.children and hasattr(fa, "props"):
-                    # FuncArg might have expr in children or as single child
-                    for fc in fa.children:
-                        arg_strs.append(_emit_expr(fc, ""))
-        if not arg_strs and args_list:
-            for fa in args_list:
-                if isinstance(fa, ASTNode):
-                    # emit first expression child of FuncArg
-                    for fc in fa.children:
-                        arg_strs.append(_emit_expr(fc, ""))
-                        break
-        return pos + indent + base + "(" + ", ".join(arg_strs) + ")"
-    if node.type == "MemberAccess":
-        return pos + indent + _emit_member_access(node, indent)
-    if node.type == "Block":
-        # Block can contain a single expression or multiple statements
-        parts = []
-        for c in node.children:
-            parts.append(_emit_stmt(c, indent + "    "))
-        body = "\n".join(parts) if parts else ""
-        if _ROUND_TRIP:
-            return pos + indent + "{ =>\n" + body + "\n" + indent + "}()"
-        return pos + indent + "{\n" + body + "\n" + indent + "}"
-    if node.type == "AssignExpr":
-        left = ""
-        right = ""
-        for c in node.children:
-            if "leftValue" in str(c.type) or c.type == "MemberAccess" or c.type == "RefExpr":
-                if not left:
-                    left = _emit_expr(c, "")
-            else:
-                right = _emit_expr(c, "")
-        # Sometimes left/right are in section comments; scan children
-        for i, c in enumerate(node.children):
-            if c.type == "MemberAccess" or c.type == "RefExpr":
-                left = _emit_expr(c, "").strip()
-            elif c.type in ("CallExpr", "RefExpr", "LitConstExpr", "Block", "MemberAccess"):
-                if not right:
-                    right = _emit_expr(c, "").strip()
-        # Try to get from first two expr-like children
-        expr_children = [c for c in node.children if c.type in ("MemberAccess", "RefExpr", "CallExpr", "LitConstExpr", "Block")]
-        if len(expr_children) >= 2:
-            left = _emit_expr(expr_children[0], "").strip()
-            right = _emit_expr(expr_children[1], "").strip()
-        if len(expr_children) == 1:
-            right = _emit_expr(expr_children[0], "").strip()
-        return pos + indent + f"{left} = {right}"
-    if node.type == "BinaryExpr":
-        op = node.name.strip() if node.name else node.props.get("ty", "?")
-        parts = []
-        for c in node.children:
-            parts.append(_emit_expr(c, "").strip())
-        if len(parts) >= 2:
-            return pos + indent + f"({parts[0]} {op} {parts[1]})"
-        return pos + indent + op.join(parts)
-    if node.type == "IfExpr":
-        cond = ""
-        then_b = ""
-        else_b = ""
-        for c in node.children:
-            if "condExpr" in str(c.props) or (c.type == "Block" and not then_b and cond):
-                if not cond and c.type != "Block":
-                    cond = _emit_expr(c, "").strip()
-            if c.type == "Block":
-                if not then_b:
-                    then_b = _emit_brace_body(c, indent + "    ")
-                else:
-                    else_b = _emit_brace_body(c, indent + "    ")
-        # Heuristic: first non-Block is cond, then Block then Block
-        non_block = [c for c in node.children if c.type != "Block"]
-        blocks = [c for c in node.children if c.type == "Block"]
-        if non_block:
-            cond = _emit_expr(non_block[0], "").strip()
-        if len(blocks) >= 1:
-            then_b = _emit_brace_body(blocks[0], indent + "    ")
-        if len(blocks) >= 2:
-            else_b = _emit_brace_body(blocks[1], indent + "    ")
-        if not cond:
-            cond = "true"
-        out = pos + indent + f"if ({cond}) {{\n{then_b}\n{indent}}}"
-        if else_b:
-            out += f" else {{\n{else_b}\n{indent}}}"
-        return out
-    if node.type == "MatchExpr":
-        sel = ""
+        else:
+            pop()
+
+
+def _emit_inline(out: Emitter, node: ASTNode, level: int = 0) -> Iterator[tuple]:
+    """Emit `node` with surrounding whitespace stripped (operands, arguments, returned values)."""
+    m = out.mark()
+    yield _emit_expr, node, level
+    out.strip(m)
+
+
+def _emit_expr(out: Emitter, node: ASTNode, level: int) -> Optional[Iterator[tuple]]:
+    """Emit expression node to Cangjie: position comment, indentation, then its registered emitter."""
+    out.position(node)
+    out.indent(level)
+    return _EXPR_EMITTERS.get(node.type, _emit_unknown_expr)(out, node, level)
+
+
+def _emit_ref_expr(out: Emitter, node: ASTNode, level: int) -> None:
+    out.write(_sanitize_identifier(out, node.name.strip()) if node.name else "?")
+
+
+def _emit_lit_const_expr(out: Emitter, node: ASTNode, level: int) -> None:
+    # LitConstExpr: String "..." or Integer "0" or Unit "()"
+    kind = (node.name or node.props.get("ty", "")).strip()
+    value = (node.value or "").strip()
+    if "String" in kind or "string" in kind:
+        out.write(f'"{value}"' if value else '""')
+    elif "Integer" in kind or "Int" in kind:
+        out.write(value if value else "0")
+    elif "Bool" in kind:
+        out.write(value if value else "false")
+    else:
+        out.write(value if value else "()")
+
+
+def _emit_call_expr(out: Emitter, node: ASTNode, level: int) -> Iterator[tuple]:
+    base = out.mark()
+    for c in node.children:
+        if c.type == "BaseFunc":
+            yield _emit_base_func, c, 0
+            break
+    if out.is_empty(base):
         for c in node.children:
-            if c.type == "selector":
-                if c.children:
-                    sel = _emit_expr(c.children[0], "").strip()
-                    break
-                continue
-            if c.type not in ("MatchCase", "patterns"):
-                sel = _emit_expr(c, "").strip()
+            if c.type == "MemberAccess":
+                yield _emit_member_access, c, 0
                 break
-        sel_node = node.props.get("selector")
-        cases = node.list_props.get("matchCases", [])
-        case_strs = []
-        for mc in cases:
-            if isinstance(mc, ASTNode) and mc.type == "MatchCase":
-                case_strs.append(_emit_match_case(mc, indent + "    "))
-        return pos + indent + f"match ({sel}) {{\n" + "\n".join(case_strs) + "\n" + indent + "}"
-    if node.type == "ReturnExpr":
-        for c in node.children:
-            if c.type != "ReturnExpr":
-                e = _emit_expr(c, indent).strip()
-                if "\n" in e:
-                    first, rest = e.split("\n", 1)
-                    return pos + indent + "return " + first + "\n" + rest
-                return pos + indent + "return " + e
-        return pos + indent + "return ()"
-    if node.type == "ThrowExpr":
-        for c in node.children:
-            e = _emit_expr(c, indent).strip()
-            if "\n" in e:
-                first, rest = e.split("\n", 1)
-                return pos + indent + "throw " + first + "\n" + rest
-            return pos + indent + "throw " + e
-        return pos + indent + "throw"
-    if node.type == "LambdaExpr":
-        body_node = None
-        for c in node.children:
-            if c.type == "FuncBody":
-                body_node = c
+    out.remove_suffix(base, ".init")
+    out.write("(")
+    sep = ""
+    for fa in node.list_props.get("arguments", []):
+        if isinstance(fa, ASTNode):
+            for fc in fa.children:
+                out.write(sep)
+                yield _emit_expr, fc, 0
+                sep = ", "
+    out.write(")")
+
+
+def _emit_block(out: Emitter, node: ASTNode, level: int) -> Iterator[tuple]:
+    # Block can contain a single expression or multiple statements
+    out.write("{ =>\n" if out.round_trip else "{\n")
+    yield _emit_block_body, node, level + 1
+    out.write("\n")
+    out.indent(level)
+    out.write("}()" if out.round_trip else "}")
+
+
+def _emit_assign_expr(out: Emitter, node: ASTNode, level: int) -> Iterator[tuple]:
+    # Sides are picked before emitting, so each is written in place and the rest is not emitted.
+    operands = [c for c in node.children if c.type in _ASSIGN_OPERAND_TYPES]
+    if len(operands) >= 2:
+        # First two expression-like children are left and right
+        yield _emit_inline, operands[0], 0
+        out.write(" = ")
+        yield _emit_inline, operands[1], 0
+        return
+    if operands and operands[0].type in ("MemberAccess", "RefExpr"):
+        # A lone reference is both sides
+        m = out.mark()
+        yield _emit_inline, operands[0], 0
+        left = out.parts[m:]
+        out.write(" = ")
+        out.extend(left)
+        return
+    # Otherwise the left side is the first leftValue child with any text
+    for c in node.children:
+        if "leftValue" in c.type:
+            m = out.mark()
+            yield _emit_expr, c, 0
+            if not out.is_empty(m):
                 break
-        if not body_node:
-            return pos + indent + "{ }"
-        params = body_node.list_props.get("FuncParamList", [])
-        if not params:
-            # get from FuncParamList child
-            for c in body_node.children:
-                if c.type == "FuncParamList":
-                    params = c.children
-                    break
-        param_strs = []
-        for p in (params if isinstance(params, list) else []):
-            if isinstance(p, ASTNode) and p.type == "FuncParam":
-                param_strs.append(p.name.strip() if p.name else "_")
-        body = ""
+            out.truncate(m)
+    out.write(" = ")
+    # and the right side the lone operand, else the last child that is neither
+    if operands:
+        yield _emit_inline, operands[0], 0
+        return
+    for c in reversed(node.children):
+        if "leftValue" not in c.type:
+            yield _emit_expr, c, 0
+            break
+
+
+def _emit_binary_expr(out: Emitter, node: ASTNode, level: int) -> Iterator[tuple]:
+    op = node.name.strip() if node.name else node.props.get("ty", "?")
+    children = node.children
+    if len(children) >= 2:
+        out.write("(")
+        yield _emit_inline, children[0], 0
+        out.write(f" {op} ")
+        yield _emit_inline, children[1], 0
+        out.write(")")
+    elif children:
+        yield _emit_inline, children[0], 0
+
+
+def _emit_if_expr(out: Emitter, node: ASTNode, level: int) -> Iterator[tuple]:
+    # First non-Block child is the condition, then the then/else Blocks; each emitted once.
+    cond = None
+    blocks = []
+    for c in node.children:
+        if c.type == "Block":
+            blocks.append(c)
+        elif cond is None:
+            cond = c
+    out.write("if (")
+    m = out.mark()
+    if cond is not None:
+        yield _emit_inline, cond, 0
+    if out.is_empty(m):
+        out.write("true")
+    out.write(") {\n")
+    if blocks:
+        yield _emit_brace_body, blocks[0], level + 1
+    out.write("\n")
+    out.indent(level)
+    out.write("}")
+    if len(blocks) >= 2:
+        m = out.mark()
+        out.write(" else {\n")
+        body = out.mark()
+        yield _emit_brace_body, blocks[1], level + 1
+        if out.is_empty(body):
+            out.truncate(m)
+        else:
+            out.write("\n")
+            out.indent(level)
+            out.write("}")
+
+
+def _emit_match_expr(out: Emitter, node: ASTNode, level: int) -> Iterator[tuple]:
+    out.write("match (")
+    for c in node.children:
+        if c.type == "selector":
+            if c.children:
+                yield _emit_inline, c.children[0], 0
+                break
+            continue
+        if c.type not in ("MatchCase", "patterns"):
+            yield _emit_inline, c, 0
+            break
+    out.write(") {\n")
+    sep = ""
+    for mc in node.list_props.get("matchCases", []):
+        if isinstance(mc, ASTNode) and mc.type == "MatchCase":
+            out.write(sep)
+            yield _emit_match_case, mc, level + 1
+            sep = "\n"
+    out.write("\n")
+    out.indent(level)
+    out.write("}")
+
+
+def _emit_return_expr(out: Emitter, node: ASTNode, level: int) -> Iterator[tuple]:
+    for c in node.children:
+        if c.type != "ReturnExpr":
+            out.write("return ")
+            yield _emit_inline, c, level
+            return
+    out.write("return ()")
+
+
+def _emit_throw_expr(out: Emitter, node: ASTNode, level: int) -> Iterator[tuple]:
+    if node.children:
+        out.write("throw ")
+        yield _emit_inline, node.children[0], level
+    else:
+        out.write("throw")
+
+
+def _emit_lambda_expr(out: Emitter, node: ASTNode, level: int) -> Iterator[tuple]:
+    body_node = None
+    for c in node.children:
+        if c.type == "FuncBody":
+            body_node = c
+            break
+    if not body_node:
+        out.write("{ }")
+        return
+    params = body_node.list_props.get("FuncParamList", [])
+    if not params:
+        # get from FuncParamList child
         for c in body_node.children:
-            if c.type == "Block":
-                body = _emit_brace_body(c, indent + "    ")
+            if c.type == "FuncParamList":
+                params = c.children
                 break
-        return pos + indent + f"{{ {', '.join(param_strs)} =>\n{body}\n{indent}}}"
-    if node.type == "TryExpr":
-        try_block = ""
-        catches = []
-        for c in node.children:
-            if c.type == "TryBlock":
-                for b in c.children:
-                    if b.type == "Block":
-                        try_block = _emit_block_body(b, indent + "    ")
-            if c.type == "Catch":
-                catches.append(_emit_catch(c, indent))
-        return pos + indent + "try {\n" + try_block + "\n" + indent + "}" + "".join(catches)
-    if node.type == "UnknowNode":
-        info = f"UnknowNode: {node.name or '?'}"
-        for k, v in list(node.props.items())[:3]:
-            info += f" {k}={v}"
-        return pos + indent + f"/* {info} */"
-    if node.type not in KNOWN_NODE_TYPES:
-        info = f"{node.type}: {node.name or ''}".strip()
-        return pos + indent + f"/* unknown: {info} */"
-    return pos + indent + "/* " + node.type + " */"
-
-
-def _emit_base_func(node: ASTNode, indent: str) -> str:
+    param_strs = []
+    for p in (params if isinstance(params, list) else []):
+        if isinstance(p, ASTNode) and p.type == "FuncParam":
+            param_strs.append(p.name.strip() if p.name else "_")
+    out.write(f"{{ {', '.join(param_strs)} =>\n")
+    for c in body_node.children:
+        if c.type == "Block":
+            yield _emit_brace_body, c, level + 1
+            break
+    out.write("\n")
+    out.indent(level)
+    out.write("}")
+
+
+def _emit_try_expr(out: Emitter, node: ASTNode, level: int) -> Iterator[tuple]:
+    # The last Block of the last TryBlock is the body.
+    try_block = None
+    for c in node.children:
+        if c.type == "TryBlock":
+            for b in c.children:
+                if b.type == "Block":
+                    try_block = b
+    out.write("try {\n")
+    if try_block is not None:
+        yield _emit_block_body, try_block, level + 1
+    out.write("\n")
+    out.indent(level)
+    out.write("}")
+    for c in node.children:
+        if c.type == "Catch":
+            yield _emit_catch, c, level
+
+
+def _emit_unknow_node(out: Emitter, node: ASTNode, level: int) -> None:
+    info = f"UnknowNode: {node.name or '?'}"
+    for k, v in list(node.props.items())[:3]:
+        info += f" {k}={v}"
+    out.write(f"/* {info} */")
+
+
+def _emit_placeholder(out: Emitter, node: ASTNode, level: int) -> None:
+    """Known structural node in expression position."""
+    out.write("/* " + node.type + " */")
+
+
+def _emit_unknown_expr(out: Emitter, node: ASTNode, level: int) -> None:
+    info = f"{node.type}: {node.name or ''}".strip()
+    out.write(f"/* unknown: {info} */")
+
+
+def _emit_base_func(out: Emitter, node: ASTNode, level: int = 0) -> Iterator[tuple]:
     for c in node.children:
         if c.type == "RefExpr":
-            return _sanitize_identifier((c.name or "?").strip())
+            out.write(_sanitize_identifier(out, (c.name or "?").strip()))
+            return
         if c.type == "MemberAccess":
-            return _emit_member_access(c, "")
-    return "?"
+            yield _emit_member_access, c, 0
+            return
+    out.write("?")
 
 
-def _emit_member_access(node: ASTNode, indent: str) -> str:
-    base = ""
-    field = _sanitize_identifier(node.props.get("field", ""))
+def _emit_member_access(out: Emitter, node: ASTNode, level: int = 0) -> Iterator[tuple]:
+    field = _sanitize_identifier(out, node.props.get("field", ""))
+    base = out.mark()
     for c in node.children:
         if c.type in ("RefExpr", "CallExpr", "MemberAccess"):
-            base = _emit_expr(c, "").strip()
+            yield _emit_inline, c, 0
             break
-    return f"{base}.{field}" if base else field
+    if not out.is_empty(base):
+        out.write(".")
+    out.write(field)
 
 
-def _emit_block_body(block_node: ASTNode, indent: str) -> str:
-    parts = []
+def _emit_block_body(out: Emitter, block_node: ASTNode, level: int) -> Iterator[tuple]:
+    sep = ""
     for c in block_node.children:
-        parts.append(_emit_stmt(c, indent))
-    return "\n".join(parts)
+        out.write(sep)
+        yield _emit_stmt, c, level
+        sep = "\n"
 
 
-def _emit_brace_body(block_node: ASTNode, indent: str) -> str:
+def _emit_brace_body(out: Emitter, block_node: ASTNode, level: int) -> Iterator[tuple]:
     if len(block_node.children) == 1 and block_node.children[0].type == "Block":
-        return _emit_block_body(block_node.children[0], indent)
-    return _emit_block_body(block_node, indent)
+        return _emit_block_body(out, block_node.children[0], level)
+    return _emit_block_body(out, block_node, level)
 
 
-def _emit_stmt(node: ASTNode, indent: str) -> str:
-    """Emit a statement (VarDecl, CallExpr, etc.)."""
-    pos = _position_comment(node)
-    if node.type == "VarDecl":
-        raw_name = (node.name or "").strip()
-        has_let = raw_name.startswith("let ")
-        ident = raw_name[4:].strip() if has_let else raw_name
-        ident = _sanitize_identifier(ident) if ident else "_"
-        name = f"let {ident}"
-        type_str = ""
-        init_node = None
+def _emit_var_decl(out: Emitter, node: ASTNode, level: int) -> Iterator[tuple]:
+    raw_name = (node.name or "").strip()
+    has_let = raw_name.startswith("let ")
+    ident = raw_name[4:].strip() if has_let else raw_name
+    ident = _sanitize_identifier(out, ident) if ident else "_"
+    name = f"let {ident}"
+    type_str = ""
+    init_node = None
+    for c in node.children:
+        if c.type == "RefType" or c.type == "PrimitiveType":
+            type_str = _emit_type(c)
+        elif init_node is None:
+            init_node = c
+    if not type_str:
         for c in node.children:
             if c.type == "RefType" or c.type == "PrimitiveType":
                 type_str = _emit_type(c)
-            elif init_node is None:
-                init_node = c
-        if not type_str:
-            for c in node.children:
-                if c.type == "RefType" or c.type == "PrimitiveType":
-                    type_str = _emit_type(c)
-                    break
-        if not type_str:
-            raw_ty = (node.props.get("ty") or "Unknown").strip()
-            type_str = raw_ty if raw_ty else "Unknown"
-        if not init_node:
-            return pos + indent + f"{name}: {type_str}"
-        # Emit initializer at same indent level so Block/Lambda content gets indent+4 from block
-        init_str = _emit_expr(init_node, indent).strip()
-        eq_part = f"{name}: {type_str} = "
-        if "\n" not in init_str:
-            return pos + indent + eq_part + init_str
-        # Multi-line: first line after "=", rest unchanged (already correctly indented)
-        first_line = init_str.split("\n")[0].strip()
-        rest = "\n".join(init_str.split("\n")[1:])
-        return pos + indent + eq_part + first_line + "\n" + rest
-    if node.type in ("CallExpr", "AssignExpr", "ReturnExpr", "ThrowExpr"):
-        return _emit_expr(node, indent)
-    if node.type == "Block":
-        return _emit_expr(node, indent)
-    if node.type == "IfExpr":
-        return _emit_expr(node, indent)
-    if node.type == "MatchExpr":
-        return _emit_expr(node, indent)
-    if node.type == "VarDecl":
-        return _emit_stmt(node, indent)
-    return pos + indent + _emit_expr(node, indent)
-
-
-def _get_match_pattern(match_case_node: ASTNode) -> str:
+                break
+    if not type_str:
+        raw_ty = (node.props.get("ty") or "Unknown").strip()
+        type_str = raw_ty if raw_ty else "Unknown"
+    out.position(node)
+    out.indent(level)
+    if not init_node:
+        out.write(f"{name}: {type_str}")
+        return
+    out.write(f"{name}: {type_str} = ")
+    # Initializer at the statement's level so Block/Lambda content is indented one deeper;
+    # a multi-line one continues on the following lines as emitted.
+    m = out.mark()
+    yield _emit_expr, init_node, level
+    out.strip(m)
+    out.rstrip_first_line(m)
+
+
+def _emit_stmt(out: Emitter, node: ASTNode, level: int) -> Optional[Iterator[tuple]]:
+    """Emit a statement (VarDecl, CallExpr, etc.)."""
+    emit = _STMT_EMITTERS.get(node.type)
+    if emit is not None:
+        return emit(out, node, level)
+    if node.type not in _EXPR_STATEMENTS:
+        out.position(node)
+        out.indent(level)
+    return _emit_expr(out, node, level)
+
+
+def _get_match_pattern(out: Emitter, match_case_node: ASTNode) -> str:
     """Extract pattern string from MatchCase: TypePattern (var: Type) or WildcardPattern (_). MatchCase has child 'patterns' (from 'patterns {') whose children are TypePattern or WildcardPattern, or props like WildcardPattern: _."""
     pattern_nodes = []
     patterns_node = None
@@ -363,50 +604,51 @@ def _get_match_pattern(match_case_node: ASTNode) -> str:
             pattern_nodes = c.children
             break
         if c.type == "WildcardPattern":
-            return _sanitize_identifier((c.name or "_").strip())
+            return _sanitize_identifier(out, (c.name or "_").strip())
         if c.type == "TypePattern":
             type_str = (c.props.get("ty") or "Unknown").split("<")[0]
             var_name = "_"
             for child in c.children:
                 if child.type == "VarPattern":
-                    var_name = _sanitize_identifier((child.name or "_").strip())
+                    var_name = _sanitize_identifier(out, (child.name or "_").strip())
                     break
             return f"{var_name}: {type_str}"
     if patterns_node and patterns_node.props.get("WildcardPattern") is not None:
         return (patterns_node.props.get("WildcardPattern") or "_").strip()
     for c in pattern_nodes:
         if c.type == "WildcardPattern":
-            return _sanitize_identifier((c.name or "_").strip())
+            return _sanitize_identifier(out, (c.name or "_").strip())
         if c.type == "TypePattern":
             type_str = (c.props.get("ty") or "Unknown").split("<")[0]
             var_name = "_"
             for child in c.children:
                 if child.type == "VarPattern":
-                    var_name = _sanitize_identifier((child.name or "_").strip())
+                    var_name = _sanitize_identifier(out, (child.name or "_").strip())
                     break
             return f"{var_name}: {type_str}"
     return "?"
 
 
-def _emit_match_case(node: ASTNode, indent: str) -> str:
-    pat = _get_match_pattern(node)
-    body = ""
+def _emit_match_case(out: Emitter, node: ASTNode, level: int) -> Iterator[tuple]:
+    pat = _get_match_pattern(out, node)
+    out.indent(level)
+    out.write(f"case {pat} =>\n")
     expr_or_decls = node.list_props.get("exprOrDecls", [])
     if expr_or_decls:
-        parts = []
+        sep = ""
         for item in expr_or_decls:
             if isinstance(item, ASTNode):
-                parts.append(_emit_stmt(item, indent + "    "))
-        body = "\n".join(parts)
+                out.write(sep)
+                yield _emit_stmt, item, level + 1
+                sep = "\n"
     else:
         for c in node.children:
             if c.type == "Block":
-                body = _emit_brace_body(c, indent + "    ")
+                yield _emit_brace_body, c, level + 1
                 break
-    return indent + f"case {pat} =>\n{body}"
 
 
-def _get_catch_pattern(catch_node: ASTNode) -> tuple:
+def _get_catch_pattern(out: Emitter, catch_node: ASTNode) -> tuple:
     """Extract (var_name, exception_type) from Catch -> CatchPattern -> ExceptTypePattern (VarPattern + RefType). Returns (None, None) if not found."""
     for c in catch_node.children:
         if c.type != "CatchPattern":
@@ -418,7 +660,7 @@ def _get_catch_pattern(catch_node: ASTNode) -> tuple:
             except_type = None
             for child in ep.children:
                 if child.type == "VarPattern":
-                    var_name = _sanitize_identifier((child.name or "").strip()) or "_"
+                    var_name = _sanitize_identifier(out, (child.name or "").strip()) or "_"
                 if child.type == "RefType":
                     except_type = (child.name or "").strip()
                     if not except_type:
@@ -427,17 +669,24 @@ def _get_catch_pattern(catch_node: ASTNode) -> tuple:
     return (None, None)
 
 
-def _emit_catch(node: ASTNode, indent: str) -> str:
-    var_name, except_type = _get_catch_pattern(node)
-    block = ""
+def _emit_catch(out: Emitter, node: ASTNode, level: int) -> Iterator[tuple]:
+    var_name, except_type = _get_catch_pattern(out, node)
+    # The last Block of the last CatchBlock is the handler.
+    block = None
     for c in node.children:
         if c.type == "CatchBlock":
             for b in c.children:
                 if b.type == "Block":
-                    block = _emit_block_body(b, indent + "    ")
+                    block = b
     if var_name is not None and except_type is not None:
-        return f" catch ({var_name}: {except_type}) {{\n{block}\n{indent}}}"
-    return f" catch {{\n{block}\n{indent}}}"
+        out.write(f" catch ({var_name}: {except_type}) {{\n")
+    else:
+        out.write(" catch {\n")
+    if block is not None:
+        yield _emit_block_body, block, level + 1
+    out.write("\n")
+    out.indent(level)
+    out.write("}")
 
 
 def ast_to_cangjie(
@@ -445,57 +694,207 @@ def ast_to_cangjie(
     include_comments: bool = True,
     sanitize_identifiers: bool = False,
     round_trip: bool = False,
+    workers: int = 1,
+    source_map: Optional[list] = None,
 ) -> str:
     """Convert parsed AST to desugared Cangjie source.
 
     Set include_comments=False to omit position comments.
     Set sanitize_identifiers=True to allow identifiers to be parsed by cjc.
     Set round_trip=True to emit block expressions as `{ => ... }()`.
+    Set workers=N to emit the top-level declarations in a pool of N processes (output is unchanged).
+    Pass a list as source_map to get the output without position comments and collect
+    (line, column, position) entries in it instead: each maps a 1-based line and column of the
+    output to the AST position of the node emitted there.
+    """
+    return "".join(iter_cangjie(root, include_comments, sanitize_identifiers, round_trip, workers, source_map))
+
+
+def ast_to_cangjie_files(
+    files: Iterable[ASTNode],
+    include_comments: bool = True,
+    sanitize_identifiers: bool = False,
+    round_trip: bool = False,
+    workers: int = 1,
+) -> List[str]:
+    """ast_to_cangjie of each File node (e.g. from parse_ast_package), in order."""
+    return [ast_to_cangjie(f, include_comments, sanitize_identifiers, round_trip, workers) for f in files]
+
+
+def iter_cangjie(
+    root: ASTNode,
+    include_comments: bool = True,
+    sanitize_identifiers: bool = False,
+    round_trip: bool = False,
+    workers: int = 1,
+    source_map: Optional[list] = None,
+) -> Iterator[str]:
+    """Yield the output of ast_to_cangjie(root, ...) in pieces, one per top-level declaration.
+
+    Only the piece being generated is held in memory; `"".join(iter_cangjie(root))` equals
+    `ast_to_cangjie(root)`. With workers > 1 a piece is a contiguous chunk of declarations.
+    Source map entries of a piece are appended before it is yielded.
+    """
+    out = Emitter(include_comments, sanitize_identifiers, round_trip, source_map)
+    if workers > 1:
+        return _iter_file_parallel(root, out, workers)
+    return _iter_file(root, out)
+
+
+def write_cangjie(
+    root: ASTNode,
+    fp: TextIO,
+    include_comments: bool = True,
+    sanitize_identifiers: bool = False,
+    round_trip: bool = False,
+    workers: int = 1,
+    source_map: Optional[list] = None,
+) -> None:
+    """Write ast_to_cangjie(root, ...) to the text file `fp` as each declaration is generated."""
+    for piece in iter_cangjie(root, include_comments, sanitize_identifiers, round_trip, workers, source_map):
+        fp.write(piece)
+
+
+def iter_cangjie_stream(
+    nodes: Iterable[ASTNode],
+    include_comments: bool = True,
+    sanitize_identifiers: bool = False,
+    round_trip: bool = False,
+    source_map: Optional[list] = None,
+) -> Iterator[str]:
+    """iter_cangjie for a File node followed by its top-level children, as yielded by parse_ast_stream.
+
+    Each child is emitted as soon as it arrives and is not kept, so parsing and codegen run
+    interleaved in bounded memory. The output equals ast_to_cangjie of the parsed File.
+    """
+    nodes = iter(nodes)
+    root = next(nodes, None)
+    if root is None:
+        return
+    out = Emitter(include_comments, sanitize_identifiers, round_trip, source_map)
+    yield from _iter_file(root, out, nodes)
+
+
+def write_source_map(entries: Sequence[tuple], fp: TextIO, output: Optional[str] = None) -> None:
+    """Write source map `entries` to the text file `fp`.
+
+    The first line is SOURCE_MAP_FORMAT and the name of the generated file (`output`, may be empty)
+    separated by a tab; each following line is one `line<TAB>column<TAB>position` entry.
+    """
+    fp.write(f"{SOURCE_MAP_FORMAT}\t{output or ''}\n")
+    fp.write("".join(map("%d\t%d\t%s\n".__mod__, entries)))
+
+
+def read_source_map(fp: TextIO) -> List[tuple]:
+    """Entries written by write_source_map; ValueError if `fp` does not hold a source map."""
+    if fp.readline().split("\t")[0] != SOURCE_MAP_FORMAT:
+        raise ValueError("not a source map")
+    entries = []
+    for row in fp:
+        line, column, position = row.rstrip("\n").split("\t", 2)
+        entries.append((int(line), int(column), position))
+    return entries
+
+
+def _iter_file(root: ASTNode, out: Emitter, children: Optional[Iterable[ASTNode]] = None) -> Iterator[str]:
+    """Output of a File node: its position comment, then each top-level child (default
+    root.children) preceded by a newline."""
+    if root.type != "File":
+        yield "/* not a File node */"
+        return
+    out.position(root)
+    yield out.flush()
+    for c in root.children if children is None else children:
+        out.write("\n")
+        _run(out, _TOP_LEVEL_EMITTERS.get(c.type, _emit_unknown_or_placeholder), c, 0)
+        yield out.flush()
+
+
+def _iter_file_parallel(root: ASTNode, out: Emitter, workers: int) -> Iterator[str]:
+    """_iter_file with the top-level children emitted by a process pool, in contiguous chunks of similar size.
+
+    Children still unparsed in a lazy tree (parse_ast_repr(path, lazy=True)) are shipped as their
+    dump text and parsed by the worker; others as `serialize.dumps_tree` blobs. Emitters added with
+    register_emitter reach the workers only where the pool forks.
     """
-    global _INCLUDE_COMMENTS, _SANITIZE_IDENTIFIERS, _ROUND_TRIP
-    prev = _INCLUDE_COMMENTS
-    prev_sanitize = _SANITIZE_IDENTIFIERS
-    prev_round_trip = _ROUND_TRIP
-    _INCLUDE_COMMENTS = include_comments
-    _SANITIZE_IDENTIFIERS = sanitize_identifiers
-    _ROUND_TRIP = round_trip
-    try:
-        return _ast_to_cangjie_impl(root)
-    finally:
-        _INCLUDE_COMMENTS = prev
-        _SANITIZE_IDENTIFIERS = prev_sanitize
-        _ROUND_TRIP = prev_round_trip
-
-
-def _ast_to_cangjie_impl(root: ASTNode) -> str:
-    """Implementation of ast_to_cangjie (uses _INCLUDE_COMMENTS)."""
-    out: List[str] = []
     if root.type != "File":
-        return "/* not a File node */"
-    out.append(_position_comment(root))
-    for c in root.children:
-        if c.type == "PackageSpec":
-            name = c.name.strip() if c.name else "?"
-            out.append(f"package {name}\n")
-        elif c.type == "ImportSpec":
-            path = c.props.get("prefixPaths", "")
-            name = c.name.strip() if c.name else "*"
-            if name == "*":
-                out.append(f"import {path}.*\n")
-            else:
-                out.append(f"import {path}.{{{name}}}\n")
-        elif c.type == "ClassDecl":
-            out.append(_emit_class(c))
-        elif c.type == "MainDecl":
-            out.append(_emit_main(c))
+        yield "/* not a File node */"
+        return
+    out.position(root)
+    yield out.flush()
+    items = [_pack_subtree(c) for c in root.children]
+    target = max(1, sum(len(i[-1]) if isinstance(i, tuple) else len(i) for i in items) // (workers * 4))
+    chunks: List[list] = []
+    chunk: list = []
+    size = 0
+    for item in items:
+        chunk.append(item)
+        size += len(item[-1]) if isinstance(item, tuple) else len(item)
+        if size >= target:
+            chunks.append(chunk)
+            chunk, size = [], 0
+    if chunk:
+        chunks.append(chunk)
+    if not chunks:
+        return
+    options = (out.include_comments, out.sanitize_identifiers, out.round_trip, out.source_map is not None)
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        for text, entries in pool.map(_emit_chunk, chunks, [options] * len(chunks)):
+            if entries is not None:
+                out.splice(text, entries)
+            yield text
+
+
+def _pack_subtree(node: ASTNode) -> Union[tuple, bytes]:
+    """Compact picklable form of `node`: (type, name, value, dump body) if unparsed, else a marshal blob
+    (in which the still unparsed nodes below a partly parsed lazy one are parsed first)."""
+    if isinstance(node, LazyASTNode) and node._src is not None:
+        return (node.type, node.name, node.value, node._src[node._start:node._end])
+    from .serialize import dumps_tree
+    return dumps_tree(node)
+
+
+def _emit_chunk(items: list, options: tuple) -> tuple:
+    """Emit top-level nodes packed by _pack_subtree, each preceded by a newline (process pool worker).
+
+    Returns the text and its source map entries, or None for entries when no map is collected.
+    """
+    from .serialize import loads_tree
+    nodes = []
+    for item in items:
+        if isinstance(item, tuple):
+            ntype, name, value, body = item
+            node = ASTNode(sys.intern(ntype), name, value)
+            _parse_node_content(_mmap_tokens(io.BytesIO(body)), node)
         else:
-            out.append(_emit_unknown_or_placeholder(c))
-    return "\n".join(out)
+            node = loads_tree(item)
+        nodes.append(node)
+    *flags, mapped = options
+    out = Emitter(*flags, source_map=[] if mapped else None)
+    for node in nodes:
+        out.write("\n")
+        _run(out, _TOP_LEVEL_EMITTERS.get(node.type, _emit_unknown_or_placeholder), node, 0)
+    return out.getvalue(), out.source_map
+
+
+def _emit_package_spec(out: Emitter, node: ASTNode, level: int) -> None:
+    name = node.name.strip() if node.name else "?"
+    out.write(f"package {name}\n")
+
+
+def _emit_import_spec(out: Emitter, node: ASTNode, level: int) -> None:
+    path = node.props.get("prefixPaths", "")
+    name = node.name.strip() if node.name else "*"
+    if name == "*":
+        out.write(f"import {path}.*\n")
+    else:
+        out.write(f"import {path}.{{{name}}}\n")
 
 
-def _emit_class(node: ASTNode) -> str:
-    pos = _position_comment(node)
-    name = _sanitize_identifier((node.name or "").strip())
+def _emit_class(out: Emitter, node: ASTNode, level: int = 0) -> Iterator[tuple]:
+    name = _sanitize_identifier(out, (node.name or "").strip())
     inherited = node.list_props.get("inheritedTypes", [])
     base_str = ""
     if inherited:
@@ -505,31 +904,42 @@ def _emit_class(node: ASTNode) -> str:
                 bases.append(_emit_type(b))
         if bases:
             base_str = " <: " + ", ".join(bases)
-    body_parts = []
+    out.position(node)
+    out.write(f"class {name}{base_str} {{\n")
+    sep = ""
     for c in node.children:
         if c.type == "ClassBody":
             for fn in c.children:
                 if fn.type == "FuncDecl":
-                    body_parts.append(_emit_func_decl(fn, "    "))
-    body = "\n".join(body_parts) if body_parts else ""
-    return pos + f"class {name}{base_str} {{\n{body}\n}}\n"
+                    out.write(sep)
+                    yield _emit_func_decl, fn, 1
+                    sep = "\n"
+    out.write("\n}\n")
 
 
-def _emit_func_decl(node: ASTNode, indent: str) -> str:
-    pos = _position_comment(node)
-    name = _sanitize_identifier((node.name or "").strip())
+def _emit_func_decl(out: Emitter, node: ASTNode, level: int) -> Iterator[tuple]:
+    name = _sanitize_identifier(out, (node.name or "").strip())
     if " " in name and "(" in name:
         name = name.split("(")[0].strip()
     is_init = name == "init"
     params = []
     ret_type = "Unit"
+
+    def signature() -> str:
+        param_str = ", ".join(params)
+        if is_init:
+            return f"init({param_str}) {{\n"
+        return f"func {name}({param_str}): {ret_type} {{\n"
+
+    out.position(node)
+    out.indent(level)
     for c in node.children:
         if c.type == "FuncBody":
             for fb in c.children:
                 if fb.type == "FuncParamList":
                     for p in fb.children:
                         if p.type == "FuncParam":
-                            pname = _sanitize_identifier((p.name or "_").strip())
+                            pname = _sanitize_identifier(out, (p.name or "_").strip())
                             pt = "Unknown"
                             for tc in p.children:
                                 if tc.type in ("RefType", "PrimitiveType"):
@@ -542,36 +952,104 @@ def _emit_func_decl(node: ASTNode, indent: str) -> str:
                 if fb.type == "RefType" and not fb.name:
                     ret_type = fb.props.get("ty", ret_type)
                 if fb.type == "Block":
-                    body = _emit_block_body(fb, indent + "    ")
-                    param_str = ", ".join(params)
-                    if is_init:
-                        return pos + indent + f"init({param_str}) {{\n{body}\n{indent}}}\n"
-                    return pos + indent + f"func {name}({param_str}): {ret_type} {{\n{body}\n{indent}}}\n"
-    param_str = ", ".join(params)
-    if is_init:
-        return pos + indent + f"init({param_str}) {{\n{indent}}}\n"
-    return pos + indent + f"func {name}({param_str}): {ret_type} {{\n{indent}}}\n"
-
-
-def _emit_main(node: ASTNode) -> str:
-    pos = _position_comment(node)
+                    out.write(signature())
+                    yield _emit_block_body, fb, level + 1
+                    out.write("\n")
+                    out.indent(level)
+                    out.write("}\n")
+                    return
+    out.write(signature())
+    out.indent(level)
+    out.write("}\n")
+
+
+def _emit_main(out: Emitter, node: ASTNode, level: int = 0) -> Iterator[tuple]:
+    out.position(node)
     for c in node.children:
         if c.type == "FuncDecl" and (c.name or "").strip().startswith("main"):
-            # Emit main() { ... } (no func/return type)
-            body = ""
+            # Emit main() { ... } (no func/return type); the body is the first Block of the last FuncBody that has one
+            block = None
             for fb in c.children:
                 if fb.type == "FuncBody":
                     for bl in fb.children:
                         if bl.type == "Block":
-                            body = _emit_block_body(bl, "    ")
+                            block = bl
                             break
-            return pos + f"main() {{\n{body}\n}}\n"
-    return pos + "main() {\n}\n"
+            out.write("main() {\n")
+            if block is not None:
+                yield _emit_block_body, block, 1
+            out.write("\n}\n")
+            return
+    out.write("main() {\n}\n")
 
 
-def _emit_unknown_or_placeholder(node: ASTNode) -> str:
-    pos = _position_comment(node)
+def _emit_unknown_or_placeholder(out: Emitter, node: ASTNode, level: int = 0) -> None:
     info = f"{node.type}: {node.name or ''}"
     for k in list(node.props.keys())[:2]:
         info += f" {k}={node.props[k]}"
-    return pos + f"/* {info} */\n"
+    out.position(node)
+    out.write(f"/* {info} */\n")
+
+
+EmitFn = Callable[[Emitter, ASTNode, int], Optional[Iterator[tuple]]]
+
+# Expression emitters by node type, called after the position comment and indentation.
+_EXPR_EMITTERS: Dict[str, EmitFn] = {
+    "RefExpr": _emit_ref_expr,
+    "LitConstExpr": _emit_lit_const_expr,
+    "CallExpr": _emit_call_expr,
+    "MemberAccess": _emit_member_access,
+    "Block": _emit_block,
+    "AssignExpr": _emit_assign_expr,
+    "BinaryExpr": _emit_binary_expr,
+    "IfExpr": _emit_if_expr,
+    "MatchExpr": _emit_match_expr,
+    "ReturnExpr": _emit_return_expr,
+    "ThrowExpr": _emit_throw_expr,
+    "LambdaExpr": _emit_lambda_expr,
+    "TryExpr": _emit_try_expr,
+    "UnknowNode": _emit_unknow_node,
+}
+# Structural nodes have no expression form of their own
+_EXPR_EMITTERS.update(dict.fromkeys((
+    "File", "PackageSpec", "ImportSpec", "ClassDecl", "ClassBody", "MainDecl",
+    "FuncDecl", "FuncBody", "FuncParamList", "FuncParam", "VarDecl", "BaseFunc",
+    "RefType", "PrimitiveType", "MatchCase", "TryBlock", "Catch", "CatchPattern",
+    "CatchBlock", "ExceptTypePattern", "VarPattern", "WildcardPattern",
+    "FuncArg", "FinallyBlock", "TypePattern",
+), _emit_placeholder))
+
+# Node types with an emitter; others get an `/* unknown: ... */` placeholder
+KNOWN_NODE_TYPES = _EXPR_EMITTERS.keys()
+
+# Statement emitters that write their own position comment and indentation
+_STMT_EMITTERS: Dict[str, EmitFn] = {"VarDecl": _emit_var_decl}
+# Expressions that stand alone as statements; any other node in statement position gets its
+# position comment and indentation written twice (once here, once by _emit_expr).
+_EXPR_STATEMENTS = {"CallExpr", "AssignExpr", "ReturnExpr", "ThrowExpr", "Block", "IfExpr", "MatchExpr"}
+
+# Emitters for the children of a File node, called after the separating newline
+_TOP_LEVEL_EMITTERS: Dict[str, EmitFn] = {
+    "PackageSpec": _emit_package_spec,
+    "ImportSpec": _emit_import_spec,
+    "ClassDecl": _emit_class,
+    "MainDecl": _emit_main,
+}
+
+
+def register_emitter(node_type: str, emit: EmitFn, top_level: bool = False) -> None:
+    """Emit nodes of `node_type` with `emit(out, node, level)`, replacing any existing emitter.
+
+    By default `emit` handles the node as an expression or statement: its position comment and
+    indentation are already written, and nested lines are indented from `level` (the `out.emit_*`
+    helpers emit children). With top_level=True it handles the node as a child of File instead
+    (e.g. StructDecl, EnumDecl) and writes its own `out.position(node)`. Like the built-in
+    emitters, `emit` may instead be a generator yielding (emit, child, level) tasks, which run
+    on the codegen work stack rather than nesting Python frames.
+    """
+    if top_level:
+        _TOP_LEVEL_EMITTERS[node_type] = emit
+        return
+    _EXPR_EMITTERS[node_type] = emit
+    _STMT_EMITTERS.pop(node_type, None)
+    _EXPR_STATEMENTS.add(node_type)
@@ -0,0 +1,192 @@
+"""
+Conversion daemon: keep ast_repr_parser loaded in one process and serve conversions over a Unix domain socket,
+plus the client used by `run_ast_to_cangjie.py --daemon`.
+Requests and responses are single JSON lines, so one connection can carry any number of conversions.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import socket
+import stat
+
+# Annotations are not evaluated, so the client (run_ast_to_cangjie.py --daemon) does not import typing.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Optional
+
+_OPTIONS = ("include_comments", "sanitize_identifiers", "round_trip")
+
+
+def default_socket_path() -> str:
+    """`$AST_REPR_SOCKET`, else `ast_repr_parser.sock` in `$XDG_RUNTIME_DIR`, else a socket in a
+    per-user directory in /tmp (created private by make_server)."""
+    env = os.environ.get("AST_REPR_SOCKET")
+    if env:
+        return env
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, "ast_repr_parser.sock")
+    return f"/tmp/ast_repr_parser-{os.getuid()}/daemon.sock"
+
+
+def _check_dir(directory: str) -> None:
+    """Raise PermissionError if another user could replace entries of `directory`.
+
+    It must belong to this user or root, and be writable by no one else unless sticky (like /tmp).
+    """
+    st = os.stat(directory)
+    if st.st_uid not in (0, os.getuid()) or (st.st_mode & 0o022 and not st.st_mode & stat.S_ISVTX):
+        raise PermissionError(f"{directory} is writable by other users")
+
+
+def _check_socket(path: str) -> None:
+    """Raise PermissionError unless `path` is a socket of this user that no other user can swap out.
+
+    Keeps a client from sending dump paths to (and taking output from) a socket another local user
+    bound first. FileNotFoundError is raised if there is nothing at `path`.
+    """
+    st = os.lstat(path)
+    if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a socket owned by this user")
+    _check_dir(os.path.dirname(os.path.abspath(path)))
+
+
+def convert_request(request: dict) -> str:
+    """ast_to_cangjie output for a request: `path` (read by the daemon) or inline `text`, plus options."""
+    from .codegen import ast_to_cangjie
+    from .parser import parse_ast_repr
+    options = {k: bool(request[k]) for k in _OPTIONS if k in request}
+    if "text" in request:
+        root = parse_ast_repr(io.StringIO(request["text"]))
+    elif "path" in request:
+        root = parse_ast_repr(request["path"])
+    else:
+        raise ValueError("request needs 'path' or 'text'")
+    return ast_to_cangjie(root, **options)
+
+
+def make_server(path: Optional[str] = None) -> Any:
+    """A threading Unix socket server bound at `path` (default_socket_path()); run it with serve_forever().
+
+    Each connection is handled in its own thread, and the socket is only accessible to the current user.
+    A missing directory is created accessible to the current user only. A stale socket file is
+    replaced; OSError is raised if a daemon is already listening there, and PermissionError if
+    the path or its directory could be controlled by another user.
+    """
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            for line in self.rfile:
+                try:
+                    response = {"output": convert_request(json.loads(line))}
+                except Exception as e:
+                    response = {"error": f"{type(e).__name__}: {e}"}
+                self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+    class Server(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+        def server_close(self) -> None:
+            super().server_close()
+            try:
+                os.remove(self.server_address)
+            except OSError:
+                pass
+
+    path = path or default_socket_path()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    _check_dir(directory)
+    if os.path.lexists(path):
+        sock = _connect(path)
+        if sock is not None:
+            sock.close()
+            raise OSError(f"A daemon is already listening on {path}")
+        os.remove(path)
+    umask = os.umask(0o177)
+    try:
+        return Server(path, Handler)
+    finally:
+        os.umask(umask)
+
+
+def serve(path: Optional[str] = None) -> None:
+    """Serve conversions on the socket at `path` until interrupted (SIGINT or SIGTERM); the socket is then removed."""
+    import signal
+
+    def stop(signum: int, frame: Any) -> None:
+        raise KeyboardInterrupt
+
+    server = make_server(path)
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def _connect(path: str) -> Optional[socket.socket]:
+    """Connected socket, None when no daemon is listening, PermissionError when `path` is not trusted."""
+    try:
+        _check_socket(path)
+    except FileNotFoundError:
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+    return sock
+
+
+class DaemonClient:
+    """Connection to a running daemon; use connect() to get one, or None when no daemon is running.
+
+    connect() raises PermissionError rather than use a socket that is not owned by this user or
+    sits in a directory other users can write to.
+    """
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.rfile = sock.makefile("rb")
+
+    @classmethod
+    def connect(cls, path: Optional[str] = None) -> Optional["DaemonClient"]:
+        sock = _connect(path or default_socket_path())
+        return cls(sock) if sock is not None else None
+
+    def convert(self, path: Optional[str] = None, text: Optional[str] = None, **options: bool) -> str:
+        """Converted source of the dump at `path` (resolved against this process's directory) or of `text`.
+
+        Conversion errors reported by the daemon are raised as ValueError.
+        """
+        request = {k: v for k, v in options.items() if k in _OPTIONS}
+        if text is not None:
+            request["text"] = text
+        else:
+            request["path"] = os.path.abspath(path)
+        self.sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        line = self.rfile.readline()
+        if not line:
+            raise ConnectionError("daemon closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response["output"]
+
+    def close(self) -> None:
+        self.rfile.close()
+        self.sock.close()
+
+    def __enter__(self) -> "DaemonClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
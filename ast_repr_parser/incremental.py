@@ -0,0 +1,150 @@
+"""
+Incremental codegen: keep the output of each top-level declaration with a structural digest of its subtree,
+and on the next run re-emit only the declarations whose digest changed, splicing the rest from the previous output.
+"""
+
+import hashlib
+import marshal
+import os
+from typing import Dict, List, Optional, Union
+
+from .codegen import Emitter, _TOP_LEVEL_EMITTERS, _emit_unknown_or_placeholder, _run
+from .parser import ASTNode, LazyASTNode, _LazyPattern
+
+# Bump when codegen changes what a stored declaration would look like.
+INCREMENTAL_VERSION = 1
+_STATE_FORMAT = "cjinc"
+
+_POSITION_LINE_RE_B = _LazyPattern(rb"(?m)^[ \t]*position:[^\n]*\n?")
+# The UnknowNode placeholder comment prints the node's first props, position included, even without comments
+_PROPS_SHOWN = "UnknowNode"
+
+
+def subtree_digest(node: ASTNode, include_positions: bool = True) -> bytes:
+    """Digest of the type, name, value, props, list props and children of the tree under `node`.
+
+    Positions are ignored unless include_positions, since they only reach the output as comments;
+    those of UnknowNode placeholders, which print them regardless, are always included.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    records = []
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        children = n.children
+        stack.extend(children)
+        props = n.props
+        if props and not include_positions and "position" in props and n.type != _PROPS_SHOWN:
+            props = {k: v for k, v in props.items() if k != "position"}
+        spec = None
+        if n.list_props:
+            spec = []
+            for key, items in n.list_props.items():
+                spec.append((key, tuple(None if isinstance(e, ASTNode) else (e,) for e in items)))
+                stack.extend(e for e in items if isinstance(e, ASTNode))
+            spec = tuple(spec)
+        records.append((n.type, n.name, n.value, props or None, len(children), spec))
+        if len(records) >= 4096:
+            h.update(marshal.dumps(records))
+            records.clear()
+    h.update(marshal.dumps(records))
+    return h.digest()
+
+
+def _dump_digest(node: LazyASTNode, include_positions: bool = True) -> bytes:
+    """Digest of the dump text of the still unparsed `node`, without parsing it.
+
+    Differs from subtree_digest of the same node, so a declaration is regenerated once when a
+    tree switches between lazy and eager parsing. Positions are kept throughout a body that
+    mentions UnknowNode, as telling its position lines apart would need a parse.
+    """
+    body = node._src[node._start:node._end]
+    if not include_positions and _PROPS_SHOWN.encode() not in body:
+        body = _POSITION_LINE_RE_B.sub(b"", body)
+    h = hashlib.blake2b(marshal.dumps((node.type, node.name, node.value)), digest_size=16)
+    h.update(body)
+    return h.digest()
+
+
+class IncrementalCodegen:
+    """ast_to_cangjie for successive dumps of one File, re-emitting only changed top-level declarations.
+
+    The previous run is kept as (digest, text) per top-level child. A child whose digest matches a
+    stored one (in any position, so moved declarations are reused too) takes that text; the others
+    are emitted. The result equals ast_to_cangjie(root, ...) with the same options. Changes are
+    detected per top-level declaration, so an edited member re-emits its whole class. With position
+    comments on, positions are part of the digest, so declarations shifted by an edit above them
+    are re-emitted.
+
+    Declarations still unparsed in a lazy tree (parse_ast_repr(path, lazy=True)) are digested
+    from their dump text, so unchanged ones are never parsed.
+
+    `path` names a state file: it is loaded on creation (ignored if missing, stale or written with
+    other options) and rewritten by generate().
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, "os.PathLike[str]"]] = None,
+        include_comments: bool = True,
+        sanitize_identifiers: bool = False,
+        round_trip: bool = False,
+    ):
+        self.path = path
+        self.options = (include_comments, sanitize_identifiers, round_trip)
+        self.pieces: List[tuple] = []
+        self.reused = 0
+        self.emitted = 0
+        if path is not None:
+            self.load()
+
+    def load(self) -> None:
+        try:
+            with open(self.path, "rb") as f:
+                fmt, version, options, pieces = marshal.load(f)
+        except (OSError, ValueError, EOFError, TypeError):
+            return
+        if (fmt, version, options) == (_STATE_FORMAT, INCREMENTAL_VERSION, self.options):
+            self.pieces = pieces
+
+    def save(self) -> None:
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            marshal.dump((_STATE_FORMAT, INCREMENTAL_VERSION, self.options, self.pieces), f)
+        os.replace(tmp, self.path)
+
+    def generate(self, root: ASTNode) -> str:
+        """Output of ast_to_cangjie(root, ...), reusing the stored text of unchanged declarations."""
+        self.reused = self.emitted = 0
+        if root.type != "File":
+            return "/* not a File node */"
+        include_positions = self.options[0]
+        previous: Dict[bytes, List[str]] = {}
+        for digest, text in self.pieces:
+            previous.setdefault(digest, []).append(text)
+        out = Emitter(*self.options)
+        out.position(root)
+        parts = [out.flush()]
+        pieces = []
+        for c in root.children:
+            # Placeholders for top-level types without an emitter show the position even without comments
+            keep_positions = include_positions or c.type not in _TOP_LEVEL_EMITTERS
+            if isinstance(c, LazyASTNode) and c._src is not None:
+                digest = _dump_digest(c, keep_positions)
+            else:
+                digest = subtree_digest(c, keep_positions)
+            texts = previous.get(digest)
+            if texts:
+                text = texts.pop()
+                self.reused += 1
+            else:
+                out.write("\n")
+                _run(out, _TOP_LEVEL_EMITTERS.get(c.type, _emit_unknown_or_placeholder), c, 0)
+                text = out.flush()
+                self.emitted += 1
+            pieces.append((digest, text))
+            parts.append(text)
+        self.pieces = pieces
+        if self.path is not None:
+            self.save()
+        return "".join(parts)
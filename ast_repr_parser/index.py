@@ -0,0 +1,143 @@
+"""
+Sidecar offset index (.astidx) for random access into AST dumps.
+Records byte offsets of every top-level and member declaration so single subtrees can be parsed on demand.
+"""
+
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .parser import ASTNode, _make_node, _map_file, _mmap_tokens, _parse_node_content, parse_ast_repr
+
+INDEX_SUFFIX = ".astidx"
+_FORMAT = "astidx 1"
+
+
+@dataclass(frozen=True)
+class IndexEntry:
+    """One indexed declaration. start/end are byte offsets of its body in the dump; parent is the entry index of the enclosing declaration (-1 for top-level)."""
+    type: str
+    name: str
+    position: Optional[str]
+    start: int
+    end: int
+    parent: int = -1
+
+
+def _is_decl(node: ASTNode) -> bool:
+    return node.type.endswith("Decl")
+
+
+def build_index(path: Union[str, "os.PathLike[str]"]) -> List[IndexEntry]:
+    """Scan the dump at `path` and return entries for its top-level and member declarations."""
+    entries: List[IndexEntry] = []
+
+    def add(node: Any, parent: int) -> int:
+        entries.append(IndexEntry(node.type, node.name, node.get_position(), node._start, node._end, parent))
+        return len(entries) - 1
+
+    root = parse_ast_repr(path, lazy=True)
+    for decl in root.children:
+        if not _is_decl(decl):
+            continue
+        idx = add(decl, -1)
+        for body in decl.children:
+            if not body.type.endswith("Body"):
+                continue
+            for member in body.children:
+                if _is_decl(member):
+                    add(member, idx)
+    return entries
+
+
+def _stamp(path: Union[str, "os.PathLike[str]"]) -> List[int]:
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def write_index(entries: List[IndexEntry], index_path: str, stamp: List[int]) -> None:
+    """Write `entries` to `index_path` atomically; `stamp` is the source [size, mtime_ns]."""
+    tmp = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(json.dumps([_FORMAT] + stamp) + "\n")
+        for e in entries:
+            f.write(json.dumps([e.type, e.name, e.position, e.start, e.end, e.parent]) + "\n")
+    os.replace(tmp, index_path)
+
+
+def read_index(index_path: str, stamp: List[int]) -> Optional[List[IndexEntry]]:
+    """Entries from `index_path`, or None if it is missing, unreadable or stale for `stamp`."""
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header != [_FORMAT] + stamp:
+                return None
+            return [IndexEntry(*json.loads(line)) for line in f]
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+class IndexedDump:
+    """Random-access handle on a dump: look declarations up by (type, name) and parse just their subtree."""
+
+    def __init__(self, path: Union[str, "os.PathLike[str]"], index_path: Optional[str] = None, rebuild: bool = False):
+        self.path = os.fspath(path)
+        self.index_path = index_path or self.path + INDEX_SUFFIX
+        stamp = _stamp(self.path)
+        entries = None if rebuild else read_index(self.index_path, stamp)
+        if entries is None:
+            entries = build_index(self.path)
+            try:
+                write_index(entries, self.index_path, stamp)
+            except OSError:
+                pass  # read-only location: keep the in-memory index
+        self.entries: List[IndexEntry] = entries
+        self._by_key: Dict[Tuple[str, str], List[IndexEntry]] = {}
+        for e in entries:
+            self._by_key.setdefault((e.type, e.name), []).append(e)
+        self._buf: Any = None
+
+    def find(self, type: str, name: str) -> List[IndexEntry]:
+        """All entries with the given node type and name, in dump order."""
+        return self._by_key.get((type, name), [])
+
+    def members(self, entry: IndexEntry) -> List[IndexEntry]:
+        """Member declarations indexed under `entry`."""
+        i = self.entries.index(entry)
+        return [e for e in self.entries if e.parent == i]
+
+    def load(self, entry: IndexEntry) -> ASTNode:
+        """Parse the subtree of `entry` by seeking straight to its body."""
+        if self._buf is None:
+            self._buf = _map_file(self.path)
+        node = _make_node(entry.type, entry.name)
+        self._buf.seek(entry.start)
+        _parse_node_content(_mmap_tokens(self._buf), node)
+        return node
+
+    def get(self, type: str, name: str) -> ASTNode:
+        """Parse the first declaration with the given type and name; KeyError if none is indexed."""
+        found = self.find(type, name)
+        if not found:
+            raise KeyError(f"{type}: {name}")
+        return self.load(found[0])
+
+    def close(self) -> None:
+        if self._buf is not None:
+            self._buf.close()
+            self._buf = None
+
+    def __enter__(self) -> "IndexedDump":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def open_ast(path: Union[str, "os.PathLike[str]"], index_path: Optional[str] = None, rebuild: bool = False) -> IndexedDump:
+    """Open the dump at `path` for random access, building `<path>.astidx` on first use.
+
+    The index is rebuilt whenever the dump's size or mtime no longer match the ones it was built for.
+    """
+    return IndexedDump(path, index_path=index_path, rebuild=rebuild)
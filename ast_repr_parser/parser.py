@@ -3,98 +3,270 @@ Parse the Cangjie compiler AST text representation into a generic tree.
 Structure is bracket-driven ({ ... } and [ ... ]).
 """
 
-import re
-from dataclasses import dataclass, field
-from typing import Any, List, Optional
+import io
+import os
+import sys
+from contextlib import contextmanager
+from typing import IO, Any, Iterable, Iterator, List, Optional, Union
 
 
-_TYPE_TAG_PREFIX_RE = re.compile(
+class _LazyPattern:
+    """Stands in for `re.compile(pattern, flags)`, compiling (and importing `re`) on first use.
+
+    Each method used is cached on the instance, so later calls cost the same as on the pattern.
+    """
+
+    def __init__(self, pattern: Union[str, bytes], flags: int = 0):
+        self._args = (pattern, flags)
+
+    def __getattr__(self, name: str) -> Any:
+        import re
+        value = getattr(re.compile(*self._args), name)
+        self.__dict__[name] = value
+        return value
+
+
+_TYPE_TAG_PREFIX_RE = _LazyPattern(
     r"\b(?:Class|Enum|Interface|Generics|Primitive|Struct|Trait|TypeAlias|Alias|Module|Package)-"
 )
 
 
-@dataclass
 class ASTNode:
-    """A node in the parsed AST. type and name identify the node; props hold key-value metadata; children are nested nodes."""
-    type: str
-    name: str = ""
-    value: Optional[str] = None
-    props: dict = field(default_factory=dict)
-    children: List["ASTNode"] = field(default_factory=list)
-    list_props: dict = field(default_factory=dict)  # key -> list of ASTNode (or raw values for simple lists)
+    """A node in the parsed AST. type and name identify the node; props hold key-value metadata; children are nested nodes.
+
+    Nodes use __slots__ and create their props/children/list_props containers on first access, so
+    leaf nodes (RefExpr, PrimitiveType, ...) cost a single small object.
+    """
+    __slots__ = ("type", "name", "value", "_props", "_children", "_list_props")
+
+    def __init__(
+        self,
+        type: str,
+        name: str = "",
+        value: Optional[str] = None,
+        props: Optional[dict] = None,
+        children: Optional[List["ASTNode"]] = None,
+        list_props: Optional[dict] = None,  # key -> list of ASTNode (or raw values for simple lists)
+    ):
+        self.type = type
+        self.name = name
+        self.value = value
+        self._props = props
+        self._children = children
+        self._list_props = list_props
+
+    @property
+    def props(self) -> dict:
+        if self._props is None:
+            self._props = {}
+        return self._props
+
+    @props.setter
+    def props(self, value: dict) -> None:
+        self._props = value
+
+    @property
+    def children(self) -> List["ASTNode"]:
+        if self._children is None:
+            self._children = []
+        return self._children
+
+    @children.setter
+    def children(self, value: List["ASTNode"]) -> None:
+        self._children = value
+
+    @property
+    def list_props(self) -> dict:
+        if self._list_props is None:
+            self._list_props = {}
+        return self._list_props
+
+    @list_props.setter
+    def list_props(self, value: dict) -> None:
+        self._list_props = value
 
     def get(self, key: str, default: Any = None) -> Any:
-        if key in self.list_props:
-            return self.list_props[key]
-        return self.props.get(key, default)
+        if self._list_props and key in self._list_props:
+            return self._list_props[key]
+        if self._props:
+            return self._props.get(key, default)
+        return default
 
     def get_position(self) -> Optional[str]:
-        p = self.props.get("position")
+        p = self._props.get("position") if self._props else None
         if p is not None:
             return str(p).strip()
         return None
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ASTNode):
+            return NotImplemented
+        return (
+            self.type == other.type
+            and self.name == other.name
+            and self.value == other.value
+            and (self._props or {}) == (other._props or {})
+            and (self._children or []) == (other._children or [])
+            and (self._list_props or {}) == (other._list_props or {})
+        )
+
+    __hash__ = None  # mutable, like the dataclass it replaces
+
+    def __repr__(self) -> str:
+        return (
+            f"ASTNode(type={self.type!r}, name={self.name!r}, value={self.value!r}, "
+            f"props={self._props or {}!r}, children={self._children or []!r}, "
+            f"list_props={self._list_props or {}!r})"
+        )
+
 
 def _indent(line: str) -> int:
     return len(line) - len(line.lstrip(" "))
 
 
-def _strip_comment(line: str) -> str:
+def _node_token(rest: str) -> tuple:
+    """Token for a node header `rest {` (with the trailing ` {` already removed)."""
+    if ": " in rest:
+        idx = rest.index(": ")
+        ntype = rest[:idx].strip().rstrip(":")
+        name = rest[idx+2:].strip()
+        return ("node", ntype, name)
+    # "Block {" or "ClassBody {" or "RefType: {" (colon but no space after)
+    if ":" in rest:
+        idx = rest.rfind(":")
+        ntype = rest[:idx].strip()
+        name = rest[idx+1:].strip()
+        return ("node", ntype, name)
+    parts = rest.rsplit(None, 1)
+    if len(parts) == 2:
+        return ("node", parts[0], parts[1])
+    if len(parts) == 1:
+        return ("node", parts[0], "")
+    return ("node", rest, "")
+
+
+_COMMENT = ("comment",)
+_CLOSE = ("close",)
+_LIST_END = ("list_end",)
+_LIST_START_RE = _LazyPattern(r"([A-Za-z][A-Za-z0-9_]*)(?:\s*:\s*|\s+)\[")
+# Body of a string literal after its opening quote, up to (not including) the closing quote.
+_QUOTED_RE = _LazyPattern(r'(?:[^"\\]|\\.)*')
+
+
+def _strip_line(line: str) -> str:
+    """`line` without its `//` comment (outside string literals) and surrounding whitespace, scanning quotes only when `//` occurs."""
+    c = line.find("//")
+    if c < 0:
+        return line.strip()
     i = 0
-    while i < len(line):
-        if line[i:i+2] == "//":
-            return line[:i].rstrip()
-        if line[i] == '"':
-            i += 1
-            while i < len(line) and line[i] != '"':
-                if line[i] == "\\":
-                    i += 1
-                i += 1
-            i += 1
-            continue
-        i += 1
-    return line
-
-
-def _parse_line(line: str) -> tuple:
-    stripped = line.strip()
-    if not stripped or stripped.startswith("//"):
-        return ("comment",)
-    if stripped == "}":
-        return ("close",)
-    if stripped == "]":
-        return ("list_end",)
-    m = re.match(r"^([A-Za-z][A-Za-z0-9_]*)\s*:\s*\[\s*$", stripped)
-    if m:
-        return ("list_start", m.group(1))
-    m = re.match(r"^([A-Za-z][A-Za-z0-9_]*)\s+\[\s*$", stripped)
-    if m:
-        return ("list_start", m.group(1))
-    if stripped.endswith(" {"):
-        rest = stripped[:-2].rstrip()
-        if ": " in rest:
-            idx = rest.index(": ")
-            ntype = rest[:idx].strip().rstrip(":")
-            name = rest[idx+2:].strip()
-            return ("node", ntype, name)
-        # "Block {" or "ClassBody {" or "RefType: {" (colon but no space after)
-        if ":" in rest:
-            idx = rest.rfind(":")
-            ntype = rest[:idx].strip()
-            name = rest[idx+1:].strip()
-            return ("node", ntype, name)
-        parts = rest.rsplit(None, 1)
-        if len(parts) == 2:
-            return ("node", parts[0], parts[1])
-        if len(parts) == 1:
-            return ("node", parts[0], "")
-        return ("node", rest, "")
-    if ": " in stripped:
-        idx = stripped.index(": ")
-        key = stripped[:idx].strip()
-        value = stripped[idx+2:].strip()
-        return ("kv", key, value)
-    return ("comment",)
+    while True:
+        q = line.find('"', i, c)
+        if q < 0:
+            return line[:c].strip()
+        end = _QUOTED_RE.match(line, q + 1).end()
+        if end >= len(line) or line[end] != '"':
+            # Unterminated string: the rest of the line is not a comment.
+            return line.strip()
+        i = end + 1
+        if c < i:
+            c = line.find("//", i)
+            if c < 0:
+                return line.strip()
+
+
+def _tokenize_line(line: str) -> tuple:
+    """Classify a raw dump line, comment stripping included, in one pass."""
+    stripped = _strip_line(line)
+    if not stripped:
+        return _COMMENT
+    last = stripped[-1]
+    if last == "{":
+        if stripped[-2:-1] == " ":
+            return _node_token(stripped[:-2].rstrip())
+    elif last == "[":
+        m = _LIST_START_RE.fullmatch(stripped)
+        if m:
+            return ("list_start", m.group(1))
+    elif last == "}":
+        if len(stripped) == 1:
+            return _CLOSE
+    elif last == "]":
+        if len(stripped) == 1:
+            return _LIST_END
+    idx = stripped.find(": ")
+    if idx < 0:
+        return _COMMENT
+    return ("kv", stripped[:idx].strip(), stripped[idx+2:].strip())
+
+
+_LIST_START_RE_B = _LazyPattern(rb"([A-Za-z][A-Za-z0-9_]*)(?:\s*:\s*|\s+)\[")
+_QUOTED_RE_B = _LazyPattern(rb'(?:[^"\\]|\\.)*')
+_LBRACE, _LBRACKET, _RBRACE, _RBRACKET = b"{[}]"
+
+
+def _strip_line_bytes(line: bytes) -> bytes:
+    """`_strip_line` for undecoded lines."""
+    c = line.find(b"//")
+    if c < 0:
+        return line.strip()
+    i = 0
+    while True:
+        q = line.find(b'"', i, c)
+        if q < 0:
+            return line[:c].strip()
+        end = _QUOTED_RE_B.match(line, q + 1).end()
+        if line[end:end+1] != b'"':
+            return line.strip()
+        i = end + 1
+        if c < i:
+            c = line.find(b"//", i)
+            if c < 0:
+                return line.strip()
+
+
+def _tokenize_line_bytes(line: bytes) -> tuple:
+    """`_tokenize_line` for undecoded lines: structural lines are never decoded."""
+    stripped = _strip_line_bytes(line)
+    if not stripped:
+        return _COMMENT
+    last = stripped[-1]
+    if last == _LBRACE:
+        if stripped[-2:-1] == b" ":
+            return _node_token(stripped[:-2].decode("utf-8").rstrip())
+    elif last == _LBRACKET:
+        m = _LIST_START_RE_B.fullmatch(stripped)
+        if m:
+            return ("list_start", m.group(1).decode("ascii"))
+    elif last == _RBRACE:
+        if len(stripped) == 1:
+            return _CLOSE
+    elif last == _RBRACKET:
+        if len(stripped) == 1:
+            return _LIST_END
+    idx = stripped.find(b": ")
+    if idx < 0:
+        return _COMMENT
+    return ("kv", stripped[:idx].decode("utf-8").strip(), stripped[idx+2:].decode("utf-8").strip())
+
+
+def _map_file(path: Union[str, "os.PathLike[str]"]) -> Any:
+    """Read-only memory map of the file at `path` (stdlib mmap is imported only when used)."""
+    import mmap
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError("Empty file")
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+@contextmanager
+def _open_mmap(path: Union[str, "os.PathLike[str]"]) -> Iterator[Any]:
+    with _map_file(path) as buf:
+        yield buf
+
+
+def _mmap_tokens(buf: Any) -> Iterator[tuple]:
+    """Tokens for the lines of `buf` from its current position on."""
+    return map(_tokenize_line_bytes, iter(buf.readline, b""))
 
 
 def _normalize_type_expr(type_expr: str) -> str:
@@ -102,31 +274,71 @@ def _normalize_type_expr(type_expr: str) -> str:
     return _TYPE_TAG_PREFIX_RE.sub("", type_expr)
 
 
+def _iter_lines(f: Iterable[Union[str, bytes]]) -> Iterator[str]:
+    """Yield lines from a text or binary file object without their line terminator."""
+    for line in f:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        yield line.rstrip("\r\n")
+
+
 class LineReader:
-    def __init__(self, path: str):
-        self.lines: List[tuple] = []
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                content = line.rstrip("\n")
-                indent = _indent(content)
-                stripped = _strip_comment(content).strip()
-                self.lines.append((indent, content, stripped))
-        self.i = 0
+    """Pull lines lazily from a path or file object, keeping only a one-line lookahead.
+
+    Accepts a filesystem path, a text or binary file object (e.g. `sys.stdin`,
+    `sys.stdin.buffer`, or a `cjc --dump-ast` subprocess pipe), or any iterable of lines.
+    A path is opened (and closed by `close()`) by the reader; file objects are left open.
+    """
+
+    def __init__(self, source: Union[str, "os.PathLike[str]", IO, Iterable[str]]):
+        self._file: Optional[IO] = None
+        if isinstance(source, (str, os.PathLike)):
+            self._file = open(source, "r", encoding="utf-8")
+            source = self._file
+        self._lines = _iter_lines(source)
+        self._next: Optional[tuple] = None
+        self._advance()
+
+    def _advance(self) -> None:
+        content = next(self._lines, None)
+        if content is None:
+            self._next = None
+            return
+        self._next = (_indent(content), content, _strip_line(content))
 
     def peek(self) -> Optional[tuple]:
-        if self.i >= len(self.lines):
-            return None
-        return self.lines[self.i]
+        return self._next
 
     def consume(self) -> Optional[tuple]:
-        if self.i >= len(self.lines):
-            return None
-        t = self.lines[self.i]
-        self.i += 1
+        t = self._next
+        if t is not None:
+            self._advance()
         return t
 
     def at_end(self) -> bool:
-        return self.i >= len(self.lines)
+        return self._next is None
+
+    def tokens(self) -> Iterator[tuple]:
+        """Consume the remaining lines, yielding each one classified by `_tokenize_line`.
+
+        Once started, the reader should only be advanced through this iterator.
+        """
+        if self._next is not None:
+            content = self._next[1]
+            self._next = None
+            yield _tokenize_line(content)
+        yield from map(_tokenize_line, self._lines)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "LineReader":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
 
 
 def _parse_lit_const_name(name: str) -> tuple[str, Optional[str]]:
@@ -141,86 +353,442 @@ def _parse_lit_const_name(name: str) -> tuple[str, Optional[str]]:
     return (kind, raw_value or None)
 
 
-def _make_node(ntype: str, name: str) -> ASTNode:
+def _make_node(ntype: str, name: str, cls: type = ASTNode) -> ASTNode:
+    ntype = sys.intern(ntype)
     if ntype == "LitConstExpr":
         lit_kind, lit_value = _parse_lit_const_name(name)
-        return ASTNode(type=ntype, name=lit_kind, value=lit_value)
-    return ASTNode(type=ntype, name=name)
-
-
-def _parse_node_content(reader: LineReader, node: ASTNode) -> None:
-    """Parse node body until its closing `}` (or end-of-file)."""
-    while True:
-        cur = reader.peek()
-        if cur is None:
-            return
-        _indent_val, _raw, stripped = cur
-        kind = _parse_line(stripped)
-
-        # End of the current node body.
-        if kind[0] == "close":
-            reader.consume()
-            return
-
-        reader.consume()
-        if kind[0] == "comment":
-            continue
-        if kind[0] == "list_end":
-            continue
-        if kind[0] == "list_start":
-            key = kind[1]
-            node.list_props[key] = []
-            while True:
-                elem = reader.peek()
-                if elem is None:
-                    break
-                _ei, _eraw, estripped = elem
-                ek = _parse_line(estripped)
-                if ek[0] == "list_end":
-                    reader.consume()
-                    break
-                if ek[0] == "comment":
-                    reader.consume()
-                    continue
-                if ek[0] == "node":
-                    reader.consume()
-                    child = _make_node(ek[1], ek[2])
-                    node.list_props[key].append(child)
-                    _parse_node_content(reader, child)
-                    continue
-                # Any other token in list is consumed to ensure forward progress.
-                reader.consume()
+        return cls(ntype, lit_kind, lit_value)
+    return cls(ntype, name)
+
+
+def _parse_node_content(tokens: Iterator[tuple], node: ASTNode) -> None:
+    """Parse node body until its closing `}` (or end-of-file).
+
+    Nested nodes are tracked on an explicit stack, so nesting depth is not bounded by the
+    Python recursion limit.
+    """
+    cur = node
+    # Open list of `cur` while inside a `key: [ ... ]` block, else None.
+    items: Optional[list] = None
+    # Enclosing (node, open list) pairs of `cur`.
+    parents: List[tuple] = []
+    for kind in tokens:
+        tag = kind[0]
+        if items is not None:
+            if tag == "node":
+                child = _make_node(kind[1], kind[2])
+                items.append(child)
+                parents.append((cur, items))
+                cur, items = child, None
+            elif tag == "list_end":
+                items = None
+            # Any other token in list is consumed to ensure forward progress.
             continue
-        if kind[0] == "kv":
+        if tag == "kv":
             key, value = kind[1], kind[2]
             if key == "ty":
                 value = _normalize_type_expr(value)
-            node.props[key] = value
-            continue
-        if kind[0] == "node":
+            if cur._props is None:
+                cur._props = {}
+            cur._props[sys.intern(key)] = value
+        elif tag == "node":
             child = _make_node(kind[1], kind[2])
-            node.children.append(child)
-            _parse_node_content(reader, child)
-            continue
+            if cur._children is None:
+                cur._children = []
+            cur._children.append(child)
+            parents.append((cur, items))
+            cur = child
+        elif tag == "close":
+            if not parents:
+                return
+            cur, items = parents.pop()
+        elif tag == "list_start":
+            if cur._list_props is None:
+                cur._list_props = {}
+            items = cur._list_props[sys.intern(kind[1])] = []
+
+
+def _materializing(prop: property) -> property:
+    def fget(self: "LazyASTNode") -> Any:
+        self._materialize()
+        return prop.fget(self)
+
+    def fset(self: "LazyASTNode", value: Any) -> None:
+        self._materialize()
+        prop.fset(self, value)
+
+    return property(fget, fset)
+
+
+class LazyASTNode(ASTNode):
+    """ASTNode whose body is parsed from the memory-mapped dump on first access.
+
+    type/name/value are known up front; props, children and list_props are filled the first time
+    any of them is touched, with nested nodes created lazy in turn. `_start`/`_end` are the byte
+    offsets of the body (the lines after the header, through the closing `}`).
+    """
+    __slots__ = ("_src", "_start", "_end")
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._src = None
+        self._start = self._end = 0
+
+    def _materialize(self) -> None:
+        buf = self._src
+        if buf is not None:
+            # Parsed into a scratch node and published at once: a failed parse leaves this node
+            # unparsed, and threads materializing it concurrently each see a complete body.
+            body = ASTNode(self.type)
+            _parse_lazy_body(buf, self._start, self._end, body)
+            self._props, self._children, self._list_props = body._props, body._children, body._list_props
+            self._src = None
+
+    props = _materializing(ASTNode.props)
+    children = _materializing(ASTNode.children)
+    list_props = _materializing(ASTNode.list_props)
 
+    def get(self, key: str, default: Any = None) -> Any:
+        self._materialize()
+        return super().get(key, default)
 
-def parse_ast_repr(path: str) -> ASTNode:
-    reader = LineReader(path)
-    first = reader.consume()
-    if first is None:
-        raise ValueError("Empty file")
-    indent0, raw0, stripped0 = first
-    kind = _parse_line(stripped0)
+    def get_position(self) -> Optional[str]:
+        self._materialize()
+        return super().get_position()
+
+    def __eq__(self, other: object) -> bool:
+        self._materialize()
+        if isinstance(other, LazyASTNode):
+            other._materialize()
+        return super().__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        self._materialize()
+        return super().__repr__()
+
+
+def _skip_body(lines: Iterator[bytes]) -> None:
+    """Advance `lines` past the body of the node whose header was just read.
+
+    A cheap brace/bracket match over undecoded lines that follows the same rules as
+    `_parse_node_content` for where a node body ends.
+    """
+    in_list = False
+    # In-list flags of the open nodes nested below the skipped one.
+    stack: List[bool] = []
+    for line in lines:
+        stripped = _strip_line_bytes(line)
+        if not stripped:
+            continue
+        last = stripped[-1]
+        if last == _LBRACE:
+            if stripped[-2:-1] == b" ":
+                stack.append(in_list)
+                in_list = False
+        elif in_list:
+            if last == _RBRACKET and len(stripped) == 1:
+                in_list = False
+        elif last == _RBRACE:
+            if len(stripped) == 1:
+                if not stack:
+                    return
+                in_list = stack.pop()
+        elif last == _LBRACKET and _LIST_START_RE_B.fullmatch(stripped):
+            in_list = True
+
+
+# Bytes of a region copied out of the dump at a time by _RegionReader
+_REGION_WINDOW = 1 << 16
+
+
+class _RegionReader:
+    """Lines of `buf[start:end]` (by iteration) with a position of its own (tell()).
+
+    Lines are read from a window of at most about _REGION_WINDOW bytes copied out of `buf`, so a
+    large region is never copied as a whole and the shared file position of `buf` is not used:
+    nodes of one dump can be materialized from several threads. tell() is an offset into `buf`.
+    """
+    __slots__ = ("_buf", "_end", "_base", "_window")
+
+    def __init__(self, buf: Any, start: int, end: int):
+        self._buf = buf
+        self._end = end
+        self._load(start)
+
+    def _load(self, start: int) -> None:
+        stop = min(self._end, start + _REGION_WINDOW)
+        if stop < self._end:
+            # Extend to a line end, so every line of the window is whole
+            nl = self._buf.find(b"\n", stop - 1, self._end)
+            stop = nl + 1 if nl >= 0 else self._end
+        self._base = start
+        self._window = io.BytesIO(self._buf[start:stop])
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            yield from self._window
+            pos = self.tell()
+            if pos >= self._end:
+                return
+            self._load(pos)
+
+    def tell(self) -> int:
+        return self._base + self._window.tell()
+
+
+def _lazy_child(buf: Any, reader: _RegionReader, lines: Iterator[bytes], kind: tuple) -> LazyASTNode:
+    child = _make_node(kind[1], kind[2], LazyASTNode)
+    child._src = buf
+    child._start = reader.tell()
+    _skip_body(lines)
+    child._end = reader.tell()
+    return child
+
+
+def _parse_lazy_body(buf: Any, start: int, end: int, node: ASTNode) -> None:
+    """Parse one level of the node body at `buf[start:end]`: props and lists are filled in, nested
+    nodes are created lazy with their bodies skipped."""
+    reader = _RegionReader(buf, start, end)
+    lines = iter(reader)
+    items: Optional[list] = None
+    for line in lines:
+        kind = _tokenize_line_bytes(line)
+        tag = kind[0]
+        if items is not None:
+            if tag == "node":
+                items.append(_lazy_child(buf, reader, lines, kind))
+            elif tag == "list_end":
+                items = None
+            continue
+        if tag == "kv":
+            key, value = kind[1], kind[2]
+            if key == "ty":
+                value = _normalize_type_expr(value)
+            if node._props is None:
+                node._props = {}
+            node._props[sys.intern(key)] = value
+        elif tag == "node":
+            if node._children is None:
+                node._children = []
+            node._children.append(_lazy_child(buf, reader, lines, kind))
+        elif tag == "close":
+            return
+        elif tag == "list_start":
+            if node._list_props is None:
+                node._list_props = {}
+            items = node._list_props[sys.intern(kind[1])] = []
+
+
+def parse_ast_repr(
+    source: Union[str, "os.PathLike[str]", IO],
+    use_mmap: bool = False,
+    lazy: bool = False,
+    workers: int = 1,
+) -> ASTNode:
+    """Parse an AST dump from a path or a text/binary file object (e.g. `sys.stdin`).
+
+    Lines are read lazily, so memory use is bounded by the resulting tree rather than the dump size.
+    Set use_mmap=True (paths only) to scan the dump as bytes from a memory map, decoding only the
+    node names, prop keys and values that end up in the tree.
+    Set lazy=True (paths only) to get a tree of LazyASTNode whose bodies are parsed on first access;
+    the dump stays memory-mapped while any of its nodes is alive.
+    Set workers > 1 (paths only) to split the File body at its top-level declarations and parse the
+    pieces in a process pool of that size.
+    """
+    if use_mmap or lazy or workers > 1:
+        if not isinstance(source, (str, os.PathLike)):
+            raise TypeError("use_mmap=True, lazy=True and workers > 1 require a filesystem path")
+    if lazy:
+        root, raw0 = _lazy_root(source)
+        return _select_file(root, raw0)
+    if workers > 1:
+        root, raw0 = _lazy_root(source)
+        return _parse_parallel(os.fspath(source), _select_file(root, raw0), workers)
+    if use_mmap:
+        with _open_mmap(source) as buf:
+            first = buf.readline()
+            return _parse_root(first.decode("utf-8").rstrip("\r\n"), _mmap_tokens(buf))
+    with LineReader(source) as reader:
+        first = reader.consume()
+        if first is None:
+            raise ValueError("Empty file")
+        return _parse_root(first[1], reader.tokens())
+
+
+def parse_ast_stream(source: Union[str, "os.PathLike[str]", IO]) -> Iterator[ASTNode]:
+    """Parse a dump incrementally, for output that should start before the dump has been read.
+
+    Yields the File node (the one parse_ast_repr would return) with only its props, then each of
+    its top-level children as soon as the child's closing `}` has been read. Children are not
+    added to the File node, so memory use is bounded by the largest declaration. Props of the File
+    that follow its first child are not seen (cjc dumps list them first); top-level lists are skipped.
+    """
+    with LineReader(source) as reader:
+        first = reader.consume()
+        if first is None:
+            raise ValueError("Empty file")
+        root = _root_node(first[1])
+        tokens = reader.tokens()
+        if root.type == "Package":
+            for kind in tokens:
+                if kind[0] == "node":
+                    node = _make_node(kind[1], kind[2])
+                    if node.type == "File":
+                        root = node
+                        break
+                    _parse_node_content(tokens, node)
+                elif kind[0] == "close":
+                    break
+            if root.type != "File":
+                raise ValueError("Package root found, but no File child was present")
+        elif root.type != "File":
+            raise ValueError(f"Expected root 'File' or 'Package', got {first[1]!r}")
+        started = False
+        in_list = False
+        for kind in tokens:
+            tag = kind[0]
+            if tag == "node":
+                child = _make_node(kind[1], kind[2])
+                _parse_node_content(tokens, child)
+                if in_list:
+                    continue
+                if not started:
+                    started = True
+                    yield root
+                yield child
+            elif in_list:
+                in_list = tag != "list_end"
+            elif tag == "kv":
+                key, value = kind[1], kind[2]
+                if key == "ty":
+                    value = _normalize_type_expr(value)
+                if not started:
+                    root.props[sys.intern(key)] = value
+            elif tag == "close":
+                break
+            elif tag == "list_start":
+                in_list = True
+        if not started:
+            yield root
+
+
+def parse_ast_package(source: Union[str, "os.PathLike[str]", IO], workers: int = 1) -> List[ASTNode]:
+    """Parse a dump and return every `File` node: all files of a `Package` root, or the single `File` root.
+
+    With workers > 1 and a path, the File regions are located by a brace-matching pre-scan and
+    parsed concurrently in a process pool (a lone File root is split at its top-level declarations
+    instead); file objects are always parsed sequentially.
+    """
+    if workers > 1 and isinstance(source, (str, os.PathLike)):
+        root, raw0 = _lazy_root(source)
+        if root.type == "File":
+            return [_parse_parallel(os.fspath(source), root, workers)]
+        if root.type != "Package":
+            raise ValueError(f"Expected root 'File' or 'Package', got {raw0!r}")
+        regions = [[(c.type, c.name, c.value, c._start)] for c in root.children if c.type == "File"]
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(workers, len(regions) or 1)) as pool:
+            return [_load_regions(blob)[0] for blob in pool.map(_parse_regions, [os.fspath(source)] * len(regions), regions)]
+    with LineReader(source) as reader:
+        first = reader.consume()
+        if first is None:
+            raise ValueError("Empty file")
+        root = _root_node(first[1])
+        _parse_node_content(reader.tokens(), root)
+    if root.type == "Package":
+        return [c for c in root.children if c.type == "File"]
+    return [_select_file(root, first[1])]
+
+
+def _parse_regions(path: str, regions: List[tuple]) -> bytes:
+    """Parse nodes of the dump at `path` from (type, name, value, body offset) regions (process pool worker).
+
+    The nodes are returned as the children of a `serialize.dumps_tree` blob (see _load_regions):
+    unlike a pickled node graph it is flat, so nesting depth is unbounded, and it loads faster.
+    """
+    from .serialize import dumps_tree
+    nodes = []
+    with _open_mmap(path) as buf:
+        for ntype, name, value, start in regions:
+            node = ASTNode(sys.intern(ntype), name, value)
+            buf.seek(start)
+            _parse_node_content(_mmap_tokens(buf), node)
+            nodes.append(node)
+    return dumps_tree(ASTNode("", children=nodes))
+
+
+def _load_regions(blob: bytes) -> List[ASTNode]:
+    from .serialize import loads_tree
+    return loads_tree(blob).children
+
+
+def _parse_parallel(path: str, file_node: LazyASTNode, workers: int) -> ASTNode:
+    """Eagerly parse lazy `file_node`, farming its top-level nodes out to a process pool.
+
+    Nodes are grouped into contiguous chunks of similar byte size (a few per worker, to even out
+    the load) and stitched back in source order. The pre-scan that finds them and the rebuilding
+    of the returned blobs stay serial in this process.
+    """
+    children = file_node.children
+    lists = file_node.list_props
+    pending = children + [e for items in lists.values() for e in items]
+    target = max(1, sum(n._end - n._start for n in pending) // (workers * 4))
+    chunks: List[List[tuple]] = []
+    chunk: List[tuple] = []
+    size = 0
+    for n in pending:
+        chunk.append((n.type, n.name, n.value, n._start))
+        size += n._end - n._start
+        if size >= target:
+            chunks.append(chunk)
+            chunk, size = [], 0
+    if chunk:
+        chunks.append(chunk)
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks) or 1)) as pool:
+        parsed = iter([n for blob in pool.map(_parse_regions, [path] * len(chunks), chunks) for n in _load_regions(blob)])
+    return ASTNode(
+        file_node.type,
+        file_node.name,
+        file_node.value,
+        file_node._props,
+        [next(parsed) for _ in children] or None,
+        {key: [next(parsed) for _ in items] for key, items in lists.items()} or None,
+    )
+
+
+def _lazy_root(path: Union[str, "os.PathLike[str]"]) -> tuple:
+    """(lazy root node, raw first line) of the memory-mapped dump at `path`."""
+    buf = _map_file(path)
+    raw0 = buf.readline().decode("utf-8").rstrip("\r\n")
+    root = _root_node(raw0, LazyASTNode)
+    root._src = buf
+    root._start = buf.tell()
+    root._end = len(buf)
+    return root, raw0
+
+
+def _parse_root(raw0: str, tokens: Iterator[tuple]) -> ASTNode:
+    root = _root_node(raw0)
+    _parse_node_content(tokens, root)
+    return _select_file(root, raw0)
+
+
+def _root_node(raw0: str, cls: type = ASTNode) -> ASTNode:
+    kind = _tokenize_line(raw0)
     if kind[0] != "node":
         raise ValueError(f"Expected root node at start, got {raw0!r}")
 
     root_type, root_name = kind[1], kind[2]
     if root_name.endswith(" {"):
         root_name = root_name[:-2].rstrip()
+    return _make_node(root_type, root_name, cls)
 
-    root = _make_node(root_type, root_name)
-    _parse_node_content(reader, root)
 
+def _select_file(root: ASTNode, raw0: str) -> ASTNode:
     if root.type == "File":
         return root
 
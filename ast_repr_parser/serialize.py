@@ -0,0 +1,69 @@
+"""
+Compact binary serialization of ASTNode trees.
+Nodes are flattened into one preorder list of plain tuples and written with marshal, so depth is unbounded and loading skips the pickle object machinery.
+"""
+
+import gc
+import marshal
+from typing import List
+
+from .parser import ASTNode, LazyASTNode
+
+
+def dumps_tree(root: ASTNode) -> bytes:
+    """Serialize the tree under `root`; still unparsed nodes of a lazy tree are parsed on the way.
+
+    Each node becomes (type, name, value, props, n_children, lists) in postorder: its children and
+    then the nodes of its list props come before it. `lists` is None or a tuple of (key, items) where
+    items holds None for a node or a 1-tuple wrapping a raw value.
+    """
+    records = []
+    stack = [root]
+    # Preorder with children visited last-to-first, reversed at the end into postorder.
+    while stack:
+        node = stack.pop()
+        if node.__class__ is LazyASTNode:
+            node._materialize()
+        children = node._children or ()
+        stack.extend(children)
+        spec = None
+        if node._list_props:
+            spec = []
+            for key, items in node._list_props.items():
+                spec.append((key, tuple(None if isinstance(e, ASTNode) else (e,) for e in items)))
+                stack.extend(e for e in items if isinstance(e, ASTNode))
+            spec = tuple(spec)
+        records.append((node.type, node.name, node.value, node._props, len(children), spec))
+    records.reverse()
+    return marshal.dumps(records)
+
+
+def loads_tree(data: bytes) -> ASTNode:
+    """Rebuild the tree written by `dumps_tree`.
+
+    The cyclic GC is paused while nodes are created: the tree holds no cycles, and collections
+    triggered by the allocation burst would otherwise dominate the load time.
+    """
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _build(marshal.loads(data))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _build(records: list) -> ASTNode:
+    done: List[ASTNode] = []
+    for ntype, name, value, props, n_children, spec in records:
+        node = ASTNode(ntype, name, value, props)
+        if spec:
+            n_items = sum(e is None for _, items in spec for e in items)
+            nodes = iter(done[len(done) - n_items:])
+            del done[len(done) - n_items:]
+            node._list_props = {key: [next(nodes) if e is None else e[0] for e in items] for key, items in spec}
+        if n_children:
+            node._children = done[-n_children:]
+            del done[-n_children:]
+        done.append(node)
+    return done[0]
@@ -66,13 +66,7 @@ class TestASTReprParser(unittest.TestCase):
         self.assertIn("// position:", self.generated)
 
 
-class TestParserUnit(unittest.TestCase):
-    """Unit test with a small snippet."""
-
-    def test_parser_snippet(self):
-        """Parse a small snippet (File with PackageSpec and one ImportSpec)."""
-        import tempfile
-        snippet = """File: test.cj {
+SNIPPET = """File: test.cj {
     curFile: test.cj
     position: (1, 1, 1) (1, 10, 2)
     PackageSpec: pkgname {
@@ -84,8 +78,16 @@ class TestParserUnit(unittest.TestCase):
     }
 }
 """
+
+
+class TestParserUnit(unittest.TestCase):
+    """Unit test with a small snippet."""
+
+    def test_parser_snippet(self):
+        """Parse a small snippet (File with PackageSpec and one ImportSpec)."""
+        import tempfile
         with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
-            f.write(snippet)
+            f.write(SNIPPET)
             path = f.name
         try:
             root = parse_ast_repr(path)
@@ -99,6 +101,893 @@ class TestParserUnit(unittest.TestCase):
         finally:
             os.unlink(path)
 
+    def test_parse_file_objects(self):
+        """Text and binary file objects (stdin, pipes) parse to the same tree, CRLF included."""
+        import io
+        for f in (io.StringIO(SNIPPET), io.BytesIO(SNIPPET.replace("\n", "\r\n").encode("utf-8"))):
+            root = parse_ast_repr(f)
+            self.assertEqual(root.type, "File")
+            self.assertEqual(root.props["position"], "(1, 1, 1) (1, 10, 2)")
+            self.assertEqual([c.name for c in root.children], ["pkgname", "Foo"])
+            self.assertFalse(f.closed)
+
+    def test_mmap_mode_matches_text_mode(self):
+        """use_mmap=True yields the same tree as the text reader, including non-ASCII values."""
+        import io
+        import tempfile
+        text = SNIPPET.replace("isDecl: 1", 'isDecl: 1\n      doc: "héllo // x" // trailing\n      tags [\n      ]')
+        with tempfile.NamedTemporaryFile(mode="w", encoding="utf-8", suffix=".txt", delete=False) as f:
+            f.write(text)
+            path = f.name
+        try:
+            root = parse_ast_repr(path, use_mmap=True)
+            self.assertEqual(root, parse_ast_repr(path))
+            self.assertEqual(root.children[1].props["doc"], '"héllo // x"')
+            with self.assertRaises(TypeError):
+                parse_ast_repr(io.StringIO(text), use_mmap=True)
+        finally:
+            os.unlink(path)
+
+    def test_lazy_mode(self):
+        """lazy=True parses only what is accessed and still matches the eager tree."""
+        import tempfile
+        from ast_repr_parser.parser import LazyASTNode
+        text = SNIPPET.replace("    }\n}", "    }\n    ClassDecl: A {\n      ClassBody {\n        FuncDecl: f {\n"
+                               "          args: [\n            FuncArg {\n            }\n          ]\n        }\n      }\n    }\n}")
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
+            f.write(text)
+            path = f.name
+        try:
+            root = parse_ast_repr(path, lazy=True)
+            self.assertIsInstance(root, LazyASTNode)
+            self.assertEqual([c.type for c in root.children], ["PackageSpec", "ImportSpec", "ClassDecl"])
+            cls = root.children[2]
+            self.assertIsNotNone(cls._src)
+            self.assertEqual(cls.name, "A")
+            body = cls.children[0]
+            self.assertIsNotNone(body._src)
+            self.assertEqual(body.children[0].get("args")[0].type, "FuncArg")
+            self.assertEqual(parse_ast_repr(path), parse_ast_repr(path, lazy=True))
+        finally:
+            os.unlink(path)
+
+    def test_lazy_mode_threads(self):
+        """Lazy nodes of one dump materialize correctly from several threads; a failed parse is retried."""
+        import io
+        import sys
+        import tempfile
+        import threading
+        text = "File: t.cj {\n" + ("  ClassDecl: C {\n    ClassBody {\n" + "      FuncDecl: f {\n        k: v\n      }\n" * 50
+                                   + "    }\n  }\n") * 40
+        with tempfile.NamedTemporaryFile(mode="wb", suffix=".txt", delete=False) as f:
+            f.write(text.encode() + b"  ClassDecl: Bad {\n    doc: \xff\n  }\n}\n")
+            path = f.name
+        interval = sys.getswitchinterval()
+        try:
+            eager = parse_ast_repr(io.StringIO(text + "}\n"))
+            root = parse_ast_repr(path, lazy=True)
+            classes = root.children[:-1]
+
+            def walk(nodes):
+                for node in nodes:
+                    for body in node.children:
+                        for fn in body.children:
+                            fn.props
+
+            sys.setswitchinterval(1e-6)
+            threads = [threading.Thread(target=walk, args=(classes[i::4],)) for i in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            sys.setswitchinterval(interval)
+            self.assertEqual(classes, eager.children)
+            bad = root.children[-1]
+            for _ in range(2):
+                with self.assertRaises(UnicodeDecodeError):
+                    bad.props
+        finally:
+            sys.setswitchinterval(interval)
+            os.unlink(path)
+
+    def test_lazy_mode_memory(self):
+        """Listing the children of a large lazy node does not copy its body out of the dump."""
+        import tempfile
+        import tracemalloc
+        refs = "          RefExpr: x {\n          }\n" * 40
+        body = ("      FuncDecl: f {\n        body: [\n" + refs + "        ]\n      }\n") * 2000
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
+            f.write("File: t.cj {\n  ClassDecl: C {\n    ClassBody {\n" + body + "    }\n  }\n}\n")
+            path = f.name
+        try:
+            root = parse_ast_repr(path, lazy=True)
+            cls = root.children[0]
+            tracemalloc.start()
+            try:
+                n = len(cls.children[0].children)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            del root, cls
+        finally:
+            os.unlink(path)
+        self.assertEqual(n, 2000)
+        # The body is ~3 MB; the lazy children themselves take a few hundred KB
+        self.assertLess(peak, len(body) // 4)
+        """workers > 1 splits the File at top-level nodes and stitches them back in order."""
+        import tempfile
+        text = SNIPPET.replace("    }\n}", "    }\n    LitConstExpr: String \"x y\" {\n    }\n    tags: [\n"
+                               "      RefType: T {\n      }\n    ]\n    MainDecl: main {\n      k: v\n    }\n}")
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
+            f.write(text)
+            path = f.name
+        try:
+            self.assertEqual(parse_ast_repr(path, workers=2), parse_ast_repr(path))
+        finally:
+            os.unlink(path)
+        # Nesting beyond what pickling a node graph would allow; compared flat, as ASTNode.__eq__ recurses.
+        import sys
+        from ast_repr_parser.serialize import dumps_tree
+        depth = sys.getrecursionlimit()
+        text = "File: deep.cj {\n" + ("MainDecl: main {\n" + "Block {\n" * depth + "}\n" * (depth + 1)) * 2 + "}\n"
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
+            f.write(text)
+            path = f.name
+        try:
+            self.assertEqual(dumps_tree(parse_ast_repr(path, workers=2)), dumps_tree(parse_ast_repr(path)))
+        finally:
+            os.unlink(path)
+
+    def test_parse_package(self):
+        """parse_ast_package returns every File of a Package, sequentially or from a process pool."""
+        import io
+        import tempfile
+        from ast_repr_parser import ast_to_cangjie_files, parse_ast_package
+        body = SNIPPET.replace("\n", "\n  ")
+        text = "Package: pkgname {\n  " + body + body.replace("test.cj", "other.cj") + "}\n"
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
+            f.write(text)
+            path = f.name
+        try:
+            files = parse_ast_package(path)
+            self.assertEqual([f.name for f in files], ["test.cj", "other.cj"])
+            self.assertEqual(parse_ast_package(path, workers=2), files)
+            self.assertEqual(parse_ast_package(io.StringIO(text)), files)
+            self.assertEqual(parse_ast_package(io.StringIO(SNIPPET)), [parse_ast_repr(io.StringIO(SNIPPET))])
+            outs = ast_to_cangjie_files(files, include_comments=False)
+            self.assertEqual(outs, [ast_to_cangjie(f, include_comments=False) for f in files])
+        finally:
+            os.unlink(path)
+        # Nesting beyond what pickling a node graph would allow; compared flat, as ASTNode.__eq__ recurses.
+        import sys
+        from ast_repr_parser.serialize import dumps_tree
+        depth = sys.getrecursionlimit()
+        text = "Package: p {\n  File: deep.cj {\n" + "Block {\n" * depth + "}\n" * depth + "  }\n}\n"
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
+            f.write(text)
+            path = f.name
+        try:
+            self.assertEqual([dumps_tree(f) for f in parse_ast_package(path, workers=2)],
+                             [dumps_tree(f) for f in parse_ast_package(path)])
+        finally:
+            os.unlink(path)
+
+    def test_line_reader_is_lazy(self):
+        """LineReader only pulls one line ahead of what has been consumed."""
+        from ast_repr_parser.parser import LineReader
+        pulled = []
+
+        def lines():
+            for line in SNIPPET.splitlines():
+                pulled.append(line)
+                yield line
+
+        reader = LineReader(lines())
+        self.assertEqual(len(pulled), 1)
+        self.assertEqual(reader.consume()[2], "File: test.cj {")
+        self.assertEqual(len(pulled), 2)
+
+    def test_deep_nesting(self):
+        """Nesting far beyond the recursion limit parses without RecursionError."""
+        import io
+        import sys
+        depth = sys.getrecursionlimit() * 5
+        text = "File: deep.cj {\n" + "Block {\n" * depth + "k: v\n" + "}\n" * (depth + 1)
+        root = parse_ast_repr(io.StringIO(text))
+        node, seen = root, 0
+        while node.children:
+            node = node.children[0]
+            seen += 1
+        self.assertEqual(seen, depth)
+        self.assertEqual(node.props, {"k": "v"})
+
+    def test_tokenizer_matches_two_pass(self):
+        """_tokenize_line classifies lines exactly like the former _strip_comment + _parse_line."""
+        from ast_repr_parser.parser import _tokenize_line
+        lines = [
+            "", "   ", "}", "  ]  ", "// only comment", "{", "x}", "a:b",
+            "File: test.cj {", "Block {", "RefType: {", "Name Thing {", "  LitConstExpr: String \"a b\" {",
+            "arguments: [", "items [", "a : [  // c", "1bad: [", "x: [y",
+            "curFile: a.cj   // trailing", 'weird: "has // inside" // real', 'esc: "a \\" // b" // c',
+            'open: "unterminated // not a comment', 'tail: "ends with \\', 'a: "x"//y"z" // w',
+        ]
+        for line in lines:
+            self.assertEqual(_tokenize_line(line), _parse_line(_strip_comment(line).strip()), line)
+
+
+def _strip_comment(line):
+    """Former comment stripper, the reference for _tokenize_line (with _parse_line)."""
+    i = 0
+    while i < len(line):
+        if line[i:i+2] == "//":
+            return line[:i].rstrip()
+        if line[i] == '"':
+            i += 1
+            while i < len(line) and line[i] != '"':
+                if line[i] == "\\":
+                    i += 1
+                i += 1
+            i += 1
+            continue
+        i += 1
+    return line
+
+
+_LIST_COLON_RE = re.compile(r"^([A-Za-z][A-Za-z0-9_]*)\s*:\s*\[\s*$")
+_LIST_SPACE_RE = re.compile(r"^([A-Za-z][A-Za-z0-9_]*)\s+\[\s*$")
+
+
+def _parse_line(line):
+    """Former line classifier, the reference for _tokenize_line."""
+    stripped = line.strip()
+    if not stripped or stripped.startswith("//"):
+        return ("comment",)
+    if stripped == "}":
+        return ("close",)
+    if stripped == "]":
+        return ("list_end",)
+    m = _LIST_COLON_RE.match(stripped)
+    if m:
+        return ("list_start", m.group(1))
+    m = _LIST_SPACE_RE.match(stripped)
+    if m:
+        return ("list_start", m.group(1))
+    if stripped.endswith(" {"):
+        from ast_repr_parser.parser import _node_token
+        return _node_token(stripped[:-2].rstrip())
+    if ": " in stripped:
+        idx = stripped.index(": ")
+        key = stripped[:idx].strip()
+        value = stripped[idx+2:].strip()
+        return ("kv", key, value)
+    return ("comment",)
+
+
+def _nested_if_assign(depth):
+    """File whose main body nests IfExpr -> Block -> AssignExpr -> Block `depth` times."""
+    from ast_repr_parser import ASTNode
+    inner = ASTNode("Block", children=[ASTNode("RefExpr", "done")])
+    for i in range(depth):
+        assign = ASTNode("AssignExpr", children=[ASTNode("RefExpr", f"x{i}"), inner])
+        inner = ASTNode("IfExpr", children=[
+            ASTNode("BinaryExpr", "<", children=[ASTNode("RefExpr", "i"), ASTNode("LitConstExpr", "Integer", str(i))]),
+            ASTNode("Block", children=[assign]),
+            ASTNode("Block", children=[ASTNode("RefExpr", "other")]),
+        ])
+        inner = ASTNode("Block", children=[inner])
+    main = ASTNode("FuncDecl", "main", children=[ASTNode("FuncBody", children=[inner])])
+    return ASTNode("File", "nested.cj", children=[ASTNode("MainDecl", "main", children=[main])])
+
+
+class TestCodegenUnit(unittest.TestCase):
+    """Codegen on hand-built trees."""
+
+    def test_nested_if_assign_linear(self):
+        """Every node of nested IfExpr/AssignExpr trees is emitted once, so work grows linearly."""
+        from ast_repr_parser import codegen
+        emit_expr = codegen._emit_expr
+        calls = []
+
+        def counting_emit_expr(out, node, level):
+            calls.append(node)
+            return emit_expr(out, node, level)
+
+        codegen._emit_expr = counting_emit_expr
+        try:
+            out = ast_to_cangjie(_nested_if_assign(12), include_comments=False)
+        finally:
+            codegen._emit_expr = emit_expr
+        self.assertEqual(len(calls), len({id(n) for n in calls}))
+        self.assertIn("x11 = {", out)
+        self.assertIn("if ((i < 0)) {", out)
+        self.assertEqual(out.count("} else {"), 12)
+
+    def test_nested_if_assign_time_linear(self):
+        """Codegen time of nested IfExpr/AssignExpr trees grows linearly with depth, not quadratically."""
+        import time
+        from ast_repr_parser import codegen
+        indent = codegen.Emitter.indent
+        # Indentation alone makes the output quadratic in depth; leave it out to time the emitters
+        codegen.Emitter.indent = lambda self, level: None
+        try:
+            times = []
+            for depth in (250, 2000):
+                root = _nested_if_assign(depth)
+                best = float("inf")
+                for _ in range(3):
+                    t0 = time.perf_counter()
+                    ast_to_cangjie(root, include_comments=False)
+                    best = min(best, time.perf_counter() - t0)
+                times.append(best)
+        finally:
+            codegen.Emitter.indent = indent
+        # 8x the depth: ~8x the time when linear, over 30x with the former fragment copies
+        self.assertLess(times[1] / times[0], 16)
+
+    def test_iter_cangjie_matches_ast_to_cangjie(self):
+        """Streamed pieces join to the ast_to_cangjie output, one piece per top-level child after the header."""
+        import io
+        from ast_repr_parser import iter_cangjie, write_cangjie
+        root = parse_ast_repr(io.StringIO(SNIPPET))
+        for kwargs in ({}, {"include_comments": False}, {"sanitize_identifiers": True, "round_trip": True}):
+            pieces = list(iter_cangjie(root, **kwargs))
+            self.assertEqual(len(pieces), 1 + len(root.children))
+            self.assertEqual("".join(pieces), ast_to_cangjie(root, **kwargs))
+            buf = io.StringIO()
+            write_cangjie(root, buf, **kwargs)
+            self.assertEqual(buf.getvalue(), ast_to_cangjie(root, **kwargs))
+
+    def test_stream_pipeline(self):
+        """parse_ast_stream + iter_cangjie_stream match ast_to_cangjie, and each declaration is out before the next is read."""
+        import io
+        from ast_repr_parser import iter_cangjie_stream, parse_ast_stream
+        text = SNIPPET.replace("    }\n}", "    }\n    MainDecl: main {\n      position: (2, 1, 1)\n    }\n}")
+        for kwargs in ({}, {"include_comments": False}):
+            self.assertEqual("".join(iter_cangjie_stream(parse_ast_stream(io.StringIO(text)), **kwargs)),
+                             ast_to_cangjie(parse_ast_repr(io.StringIO(text)), **kwargs))
+        package = "Package: p {\n" + text + "  File: other.cj {\n  }\n}\n"
+        self.assertEqual("".join(iter_cangjie_stream(parse_ast_stream(io.StringIO(package)))),
+                         ast_to_cangjie(parse_ast_repr(io.StringIO(package))))
+        lines = text.splitlines(keepends=True)
+        read = []
+
+        def source():
+            for line in lines:
+                read.append(line)
+                yield line
+
+        seen = []
+        for piece in iter_cangjie_stream(parse_ast_stream(source())):
+            seen.append(len(read))
+        # The header goes out with PackageSpec; it, ImportSpec and MainDecl each once their `}` is read
+        self.assertEqual(seen, [6, 6, 10, 13])
+        self.assertEqual(len(lines), 14)
+        with self.assertRaises(ValueError):
+            list(parse_ast_stream(io.StringIO("Package: p {\n}\n")))
+
+    def test_concurrent_calls_keep_their_options(self):
+        """Threads converting with different options never see each other's settings."""
+        import sys
+        from concurrent.futures import ThreadPoolExecutor
+        from ast_repr_parser import ASTNode
+        stmts = [ASTNode("RefExpr", f"$frame-{i}", props={"position": f"({i}, 2, 5) ({i}, 2, 13)"}) for i in range(200)]
+        body = ASTNode("Block", children=stmts + [ASTNode("Block", children=[ASTNode("RefExpr", "x")])])
+        main = ASTNode("FuncDecl", "main", children=[ASTNode("FuncBody", children=[body])])
+        root = ASTNode("File", "t.cj", children=[ASTNode("MainDecl", "main", children=[main])])
+        combos = [
+            {},
+            {"include_comments": False},
+            {"sanitize_identifiers": True, "round_trip": True},
+            {"include_comments": False, "sanitize_identifiers": True, "round_trip": True},
+        ]
+        expected = [ast_to_cangjie(root, **kw) for kw in combos]
+        self.assertEqual(len(set(expected)), len(combos))
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                jobs = [i % len(combos) for i in range(200)]
+                results = list(pool.map(lambda i: ast_to_cangjie(root, **combos[i]), jobs))
+        finally:
+            sys.setswitchinterval(interval)
+        for i, out in zip(jobs, results):
+            self.assertEqual(out, expected[i])
+
+    def test_register_emitter(self):
+        """Registered emitters handle new expression/statement and top-level node types."""
+        from unittest import mock
+        from ast_repr_parser import ASTNode, codegen, register_emitter
+
+        def emit_while(out, node, level):
+            cond, body = node.children
+            out.write("while (")
+            out.emit_expr(cond, 0)
+            out.write(") {\n")
+            out.emit_block_body(body, level + 1)
+            out.write("\n" + "    " * level + "}")
+
+        def emit_struct(out, node, level):
+            out.position(node)
+            out.write(f"struct {node.name} {{\n}}\n")
+
+        loop = ASTNode("WhileExpr", children=[ASTNode("RefExpr", "go"), ASTNode("Block", children=[
+            ASTNode("CallExpr", children=[ASTNode("BaseFunc", children=[ASTNode("RefExpr", "step")])])])])
+        main = ASTNode("FuncDecl", "main", children=[ASTNode("FuncBody", children=[ASTNode("Block", children=[loop])])])
+        root = ASTNode("File", "t.cj", children=[ASTNode("StructDecl", "S"), ASTNode("MainDecl", "main", children=[main])])
+        before = ast_to_cangjie(root, include_comments=False)
+        self.assertIn("/* StructDecl: S */", before)
+        self.assertIn("/* unknown: WhileExpr: */", before)
+        with mock.patch.dict(codegen._EXPR_EMITTERS), mock.patch.dict(codegen._TOP_LEVEL_EMITTERS), \
+                mock.patch.object(codegen, "_EXPR_STATEMENTS", set(codegen._EXPR_STATEMENTS)):
+            register_emitter("WhileExpr", emit_while)
+            register_emitter("StructDecl", emit_struct, top_level=True)
+            self.assertIn("WhileExpr", codegen.KNOWN_NODE_TYPES)
+            out = ast_to_cangjie(root, include_comments=False)
+        self.assertEqual(out, "\nstruct S {\n}\n\nmain() {\n    while (go) {\n        step()\n    }\n}\n")
+        self.assertEqual(ast_to_cangjie(root, include_comments=False), before)
+
+    def test_parallel_codegen_matches_sequential(self):
+        """workers > 1 emits top-level declarations in a process pool, from lazy dump text or marshal blobs."""
+        import tempfile
+        root = _nested_if_assign(4)
+        root.children = root.children * 3
+        self.assertEqual(ast_to_cangjie(root, workers=2), ast_to_cangjie(root))
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
+            f.write(SNIPPET.replace("    }\n}", "    }\n    MainDecl: main {\n      position: (2, 1, 1)\n    }\n"
+                                    "    ClassDecl: A {\n      ClassBody {\n        FuncDecl: f {\n          FuncBody {\n"
+                                    "            Block {\n              RefExpr: g {\n              }\n            }\n"
+                                    "          }\n        }\n      }\n    }\n}"))
+            path = f.name
+        try:
+            expected = ast_to_cangjie(parse_ast_repr(path), include_comments=False)
+            self.assertIn("        g\n", expected)
+            self.assertEqual(ast_to_cangjie(parse_ast_repr(path, lazy=True), include_comments=False, workers=3), expected)
+            # Partly parsed: the class is parsed, the nodes below it are still lazy
+            root = parse_ast_repr(path, lazy=True)
+            root.children[-1].children
+            self.assertEqual(ast_to_cangjie(root, include_comments=False, workers=3), expected)
+        finally:
+            os.unlink(path)
+
+    def test_multiline_initializer(self):
+        """A Block initializer opens on the `let` line and its body is indented one level deeper."""
+        from ast_repr_parser import ASTNode
+        init = ASTNode("Block", children=[ASTNode("CallExpr", children=[
+            ASTNode("BaseFunc", children=[ASTNode("RefExpr", "f")])])])
+        decl = ASTNode("VarDecl", "x", children=[ASTNode("PrimitiveType", "Int64"), init])
+        main = ASTNode("FuncDecl", "main", children=[ASTNode("FuncBody", children=[ASTNode("Block", children=[decl])])])
+        root = ASTNode("File", "m.cj", children=[ASTNode("MainDecl", "main", children=[main])])
+        self.assertEqual(
+            ast_to_cangjie(root, include_comments=False),
+            "\nmain() {\n    let x: Int64 = {\n        f()\n    }\n}\n",
+        )
+
+    def test_deep_nesting(self):
+        """10,000 nested Blocks are emitted without RecursionError (each passed as a call argument, so indentation stays flat)."""
+        from ast_repr_parser import ASTNode
+        depth = 10000
+        inner = ASTNode("RefExpr", "done")
+        for _ in range(depth):
+            call = ASTNode("CallExpr", children=[ASTNode("BaseFunc", children=[ASTNode("RefExpr", "f")])])
+            call.list_props["arguments"] = [ASTNode("FuncArg", children=[ASTNode("Block", children=[inner])])]
+            inner = call
+        main = ASTNode("FuncDecl", "main", children=[ASTNode("FuncBody", children=[ASTNode("Block", children=[inner])])])
+        root = ASTNode("File", "deep.cj", children=[ASTNode("MainDecl", "main", children=[main])])
+        expected = "\nmain() {\n" + "    f({\n" * depth + "        done\n" + "})\n" * depth + "}\n"
+        self.assertEqual(ast_to_cangjie(root, include_comments=False), expected)
+
+    def test_source_map(self):
+        """source_map collects positions instead of comments; entries point at the code of their node."""
+        import io
+        from ast_repr_parser.codegen import read_source_map, write_source_map
+        root = _nested_if_assign(3)
+        main_decl = root.children[0]
+        main_decl.props["position"] = "(1, 1, 1)"
+        main_decl.children[0].children[0].children[0].children[0].props["position"] = "(2, 5, 1)"
+        entries = []
+        text = ast_to_cangjie(root, source_map=entries)
+        self.assertEqual(text, ast_to_cangjie(root, include_comments=False))
+        lines = text.split("\n")
+        self.assertEqual(
+            [(lines[ln - 1][col - 1:col + 3], pos) for ln, col, pos in entries],
+            [("main", "(1, 1, 1)"), ("if (", "(2, 5, 1)")],
+        )
+        self.assertEqual(ast_to_cangjie(root, source_map=[], workers=2), text)
+        buf = io.StringIO()
+        write_source_map(entries, buf, "nested.cj")
+        buf.seek(0)
+        self.assertEqual(read_source_map(buf), entries)
+
+    def test_incremental_codegen(self):
+        """Only changed top-level declarations are re-emitted; the output matches a full run, also from the state file."""
+        import tempfile
+        from ast_repr_parser import ASTNode
+        from ast_repr_parser.incremental import IncrementalCodegen
+
+        def func(name, msg, line):
+            call = ASTNode("CallExpr", props={"position": f"({line}, 1, 1)"}, children=[
+                ASTNode("BaseFunc", children=[ASTNode("RefExpr", "println")])])
+            call.list_props["arguments"] = [ASTNode("FuncArg", children=[ASTNode("LitConstExpr", f'String "{msg}"')])]
+            return ASTNode("FuncDecl", name, props={"position": f"({line}, 1, 1)"}, children=[
+                ASTNode("FuncBody", children=[ASTNode("Block", children=[call])])])
+
+        def file(msgs, shift=0):
+            return ASTNode("File", "t.cj", children=[
+                ASTNode("ClassDecl", f"C{i}", children=[ASTNode("ClassBody", children=[func("run", m, i + shift)])])
+                for i, m in enumerate(msgs)])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            state = os.path.join(tmp, "out.cj.cjinc")
+            first = file(["a", "b", "c"])
+            gen = IncrementalCodegen(state, include_comments=False)
+            self.assertEqual(gen.generate(first), ast_to_cangjie(first, include_comments=False))
+            self.assertEqual((gen.reused, gen.emitted), (0, 3))
+            # Shifted positions do not count as a change without comments
+            second = file(["a", "x", "c"], shift=5)
+            gen = IncrementalCodegen(state, include_comments=False)
+            self.assertEqual(gen.generate(second), ast_to_cangjie(second, include_comments=False))
+            self.assertEqual((gen.reused, gen.emitted), (2, 1))
+            # With comments they do, and state written with other options is not reused
+            gen = IncrementalCodegen(state)
+            self.assertEqual(gen.generate(second), ast_to_cangjie(second))
+            self.assertEqual((gen.reused, gen.emitted), (0, 3))
+            self.assertEqual(gen.generate(file(["a", "x", "c"], shift=6)), ast_to_cangjie(file(["a", "x", "c"], shift=6)))
+            self.assertEqual((gen.reused, gen.emitted), (0, 3))
+            self.assertEqual(gen.generate(second), ast_to_cangjie(second))
+            self.assertEqual(gen.emitted, 3)
+            self.assertEqual(gen.generate(second), ast_to_cangjie(second))
+            self.assertEqual((gen.reused, gen.emitted), (3, 0))
+
+    def test_incremental_codegen_lazy(self):
+        """Unparsed declarations of a lazy tree are digested from their dump text and stay unparsed."""
+        import tempfile
+        from ast_repr_parser.incremental import IncrementalCodegen
+
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False) as f:
+            f.write(SNIPPET.replace("    }\n}", "    }\n    MainDecl: main {\n      position: (2, 1, 1)\n    }\n}"))
+            path = f.name
+        try:
+            expected = ast_to_cangjie(parse_ast_repr(path))
+            gen = IncrementalCodegen()
+            self.assertEqual(gen.generate(parse_ast_repr(path, lazy=True)), expected)
+            root = parse_ast_repr(path, lazy=True)
+            self.assertEqual(gen.generate(root), expected)
+            self.assertEqual((gen.reused, gen.emitted), (len(root._children), 0))
+            self.assertTrue(all(c._src is not None for c in root._children))
+            # A nested UnknowNode prints its position even without comments, so moving it is a change
+            for lazy in (False, True):
+                gen = IncrementalCodegen(include_comments=False)
+                for line in (1, 7):
+                    with open(path, "w") as f:
+                        f.write("File: t.cj {\n  ClassDecl: A {\n    ClassBody {\n      FuncDecl: f {\n        FuncBody {\n"
+                                f"          Block {{\n            UnknowNode: u {{\n              position: ({line}, 1, 1)\n"
+                                "            }\n          }\n        }\n      }\n    }\n  }\n}\n")
+                    expected = ast_to_cangjie(parse_ast_repr(path), include_comments=False)
+                    self.assertIn(f"position=({line}, 1, 1)", expected)
+                    self.assertEqual(gen.generate(parse_ast_repr(path, lazy=lazy)), expected)
+        finally:
+            os.unlink(path)
+
+
+class TestIndex(unittest.TestCase):
+    """Sidecar .astidx index and open_ast."""
+
+    def test_open_ast_random_access(self):
+        """Declarations are found through the index and parse to the same subtree as a full parse."""
+        import tempfile
+        from ast_repr_parser import open_ast
+        text = SNIPPET.replace("    }\n}", "    }\n    ClassDecl: A {\n      position: (3, 1, 1) (9, 1, 2)\n      ClassBody {\n"
+                               "        FuncDecl: foo {\n          position: (4, 5, 1) (6, 5, 2)\n          Block {\n          }\n"
+                               "        }\n      }\n    }\n    MainDecl: main {\n    }\n}")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "dump.txt")
+            with open(path, "w") as f:
+                f.write(text)
+            with open_ast(path) as dump:
+                self.assertTrue(os.path.isfile(path + ".astidx"))
+                self.assertEqual([(e.type, e.name, e.parent) for e in dump.entries],
+                                 [("ClassDecl", "A", -1), ("FuncDecl", "foo", 0), ("MainDecl", "main", -1)])
+                (foo,) = dump.find("FuncDecl", "foo")
+                self.assertEqual(foo.position, "(4, 5, 1) (6, 5, 2)")
+                self.assertEqual(dump.members(dump.find("ClassDecl", "A")[0]), [foo])
+                full = parse_ast_repr(path)
+                self.assertEqual(dump.get("FuncDecl", "foo"), full.children[2].children[0].children[0])
+                self.assertEqual(dump.get("ClassDecl", "A"), full.children[2])
+                with self.assertRaises(KeyError):
+                    dump.get("FuncDecl", "missing")
+            with open(path, "a") as f:
+                f.write("\n")
+            with open_ast(path) as dump:
+                self.assertEqual(len(dump.entries), 3)
+
+
+class TestCache(unittest.TestCase):
+    """Tree serialization and the on-disk parse cache."""
+
+    def test_serialize_round_trip(self):
+        """dumps_tree/loads_tree keep children, list props (nodes and raw values) and deep nesting."""
+        from ast_repr_parser import ASTNode
+        from ast_repr_parser.serialize import dumps_tree, loads_tree
+        node = ASTNode("A", "a", props={"k": "v"}, children=[ASTNode("F")],
+                       list_props={"x": ["raw", ASTNode("B"), None, ASTNode("C", children=[ASTNode("D")])],
+                                   "y": [ASTNode("E")]})
+        self.assertEqual(loads_tree(dumps_tree(node)), node)
+        deep = cur = ASTNode("Block")
+        for _ in range(10000):
+            cur.children.append(ASTNode("Block"))
+            cur = cur.children[0]
+        cur = loads_tree(dumps_tree(deep))
+        seen = 0
+        while cur.children:
+            cur = cur.children[0]
+            seen += 1
+        self.assertEqual(seen, 10000)
+
+    def test_parse_cache(self):
+        """Second parse is a hit; changed content is a miss; the directory stays within max_bytes."""
+        import tempfile
+        from ast_repr_parser.cache import ParseCache
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "dump.txt")
+            with open(path, "w") as f:
+                f.write(SNIPPET)
+            cache = ParseCache(os.path.join(tmp, "cache"))
+            first = cache.parse(path)
+            self.assertEqual(cache.parse(path), first)
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            with open(path, "w") as f:
+                f.write(SNIPPET.replace("pkgname", "other"))
+            self.assertEqual(cache.parse(path).children[0].name, "other")
+            self.assertEqual(cache.misses, 2)
+            entries = os.listdir(cache.directory)
+            self.assertEqual(len(entries), 2)
+            cache.max_bytes = os.path.getsize(os.path.join(cache.directory, entries[0]))
+            cache.evict()
+            self.assertEqual(len(os.listdir(cache.directory)), 1)
+
+
+class TestBatch(unittest.TestCase):
+    """Batch conversion of many dumps."""
+
+    def test_convert_many(self):
+        """Directories and globs expand to mirrored output paths; a bad dump fails alone, in a pool too."""
+        import glob
+        import tempfile
+        from ast_repr_parser.batch import convert_many, expand_inputs
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "in")
+            for rel, text in (("a/x.txt", SNIPPET), ("a/b/y.txt", SNIPPET.replace("pkgname", "other")),
+                              ("c/bad.txt", "garbage\n"), ("c/notes.md", "")):
+                path = os.path.join(src, rel)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w") as f:
+                    f.write(text)
+            jobs = expand_inputs([src])
+            self.assertEqual([rel for _, rel in jobs], ["a/b/y.cj", "a/x.cj", "c/bad.cj"])
+            self.assertEqual([rel for _, rel in expand_inputs([os.path.join(src, "a", "**", "*.txt")])],
+                             ["b/y.cj", "x.cj"])
+            with self.assertRaises(FileNotFoundError):
+                expand_inputs([os.path.join(src, "*.nothing")])
+            for workers in (1, 2):
+                out = os.path.join(tmp, f"out{workers}")
+                results = list(convert_many(jobs, out, workers=workers, include_comments=False))
+                self.assertEqual([r.error is None for r in results], [True, True, False])
+                for (path, rel), result in zip(jobs[:2], results):
+                    self.assertEqual(result.output, os.path.join(out, rel))
+                    with open(result.output) as f:
+                        self.assertEqual(f.read(), ast_to_cangjie(parse_ast_repr(path), include_comments=False))
+                self.assertEqual(glob.glob(os.path.join(out, "c", "*")), [])
+
+    def test_manifest_skips_unchanged(self):
+        """A rerun skips dumps whose content, options and output are unchanged; a touched dump is only hashed."""
+        import tempfile
+        from ast_repr_parser.batch import Manifest, convert_many, expand_inputs
+        with tempfile.TemporaryDirectory() as tmp:
+            src, out = os.path.join(tmp, "in"), os.path.join(tmp, "out")
+            os.makedirs(src)
+            for name in ("x", "y"):
+                with open(os.path.join(src, name + ".txt"), "w") as f:
+                    f.write(SNIPPET.replace("pkgname", name))
+            jobs = expand_inputs([src])
+            manifest_path = os.path.join(tmp, "manifest")
+
+            def run(**options):
+                return [r.skipped for r in convert_many(jobs, out, manifest=Manifest(manifest_path), **options)]
+
+            self.assertEqual(run(), [False, False])
+            self.assertEqual(run(), [True, True])
+            st = os.stat(jobs[0][0])
+            os.utime(jobs[0][0], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+            with open(jobs[1][0], "a") as f:
+                f.write("\n")
+            self.assertEqual(run(), [True, False])
+            self.assertEqual(run(include_comments=False), [False, False])
+            os.remove(os.path.join(out, "x.cj"))
+            self.assertEqual(run(include_comments=False), [False, True])
+
+
+class TestDaemon(unittest.TestCase):
+    """Conversion daemon over a Unix socket."""
+
+    def test_daemon_round_trip(self):
+        """Paths and inline text convert as locally, concurrently; errors come back as ValueError."""
+        import tempfile
+        import threading
+        from ast_repr_parser.daemon import DaemonClient, make_server
+        with tempfile.TemporaryDirectory() as tmp:
+            sock_path = os.path.join(tmp, "d.sock")
+            dump = os.path.join(tmp, "dump.txt")
+            with open(dump, "w") as f:
+                f.write(SNIPPET)
+            self.assertIsNone(DaemonClient.connect(sock_path))
+            server = make_server(sock_path)
+            thread = threading.Thread(target=server.serve_forever)
+            thread.start()
+            try:
+                with self.assertRaises(OSError):
+                    make_server(sock_path)
+                expected = ast_to_cangjie(parse_ast_repr(dump), include_comments=False)
+                results = []
+
+                def convert():
+                    with DaemonClient.connect(sock_path) as client:
+                        results.append(client.convert(dump, include_comments=False))
+                        results.append(client.convert(text=SNIPPET, include_comments=False))
+
+                threads = [threading.Thread(target=convert) for _ in range(4)]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+                self.assertEqual(results, [expected] * 8)
+                with DaemonClient.connect(sock_path) as client:
+                    with self.assertRaises(ValueError):
+                        client.convert(text="garbage\n")
+                    self.assertEqual(client.convert(dump), ast_to_cangjie(parse_ast_repr(dump)))
+            finally:
+                server.shutdown()
+                server.server_close()
+                thread.join()
+            self.assertFalse(os.path.exists(sock_path))
+
+    def test_untrusted_socket_refused(self):
+        """Sockets another user could have bound or replaced are refused by client and server."""
+        import socket
+        import tempfile
+        from ast_repr_parser.daemon import DaemonClient, make_server
+        with tempfile.TemporaryDirectory() as tmp:
+            not_socket = os.path.join(tmp, "file.sock")
+            open(not_socket, "w").close()
+            with self.assertRaises(PermissionError):
+                DaemonClient.connect(not_socket)
+            shared = os.path.join(tmp, "shared")
+            os.mkdir(shared)
+            sock_path = os.path.join(shared, "d.sock")
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(sock_path)
+            listener.listen()
+            try:
+                client = DaemonClient.connect(sock_path)
+                self.assertIsNotNone(client)
+                client.close()
+                os.chmod(shared, 0o777)
+                with self.assertRaises(PermissionError):
+                    DaemonClient.connect(sock_path)
+                with self.assertRaises(PermissionError):
+                    make_server(os.path.join(shared, "other.sock"))
+                os.chmod(shared, 0o700)
+                if os.getuid() == 0:
+                    os.chown(sock_path, 1, -1)
+                    with self.assertRaises(PermissionError):
+                        DaemonClient.connect(sock_path)
+            finally:
+                listener.close()
+        # Without $AST_REPR_SOCKET or $XDG_RUNTIME_DIR, the socket goes in a per-user directory rather than /tmp itself
+        from unittest import mock
+        from ast_repr_parser.daemon import default_socket_path
+        env = {k: v for k, v in os.environ.items() if k not in ("AST_REPR_SOCKET", "XDG_RUNTIME_DIR")}
+        with mock.patch.dict(os.environ, env, clear=True):
+            self.assertEqual(os.path.dirname(default_socket_path()), f"/tmp/ast_repr_parser-{os.getuid()}")
+
+
+# Import-time budgets (-X importtime, microseconds) over what the interpreter or argparse cost alone.
+# Both measure well under 5 ms; eager imports took over 40 ms.
+IMPORT_BUDGET_US = 20_000
+CLI_HELP_BUDGET_US = 20_000
+
+
+class TestStartup(unittest.TestCase):
+    """Import-time budget and lazy loading."""
+
+    REPO = os.path.join(os.path.dirname(__file__), "..", "..")
+
+    def _run(self, *args):
+        import subprocess
+        import sys
+        return subprocess.run([sys.executable, *args], cwd=self.REPO, env=self.env,
+                              capture_output=True, text=True, check=True)
+
+    def _import_us(self, *args):
+        """Least of a few runs of the summed top-level -X importtime cumulative times."""
+        best = None
+        for _ in range(5):
+            total = 0
+            for line in self._run("-X", "importtime", *args).stderr.splitlines():
+                parts = line.split("|")
+                if line.startswith("import time:") and len(parts) == 3 and parts[1].strip().isdigit():
+                    if not parts[2].startswith("  "):
+                        total += int(parts[1])
+            best = total if best is None else min(best, total)
+        return best
+
+    def setUp(self):
+        import tempfile
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        # Fresh bytecode, so stale or unwritable __pycache__ dirs do not add compile time
+        self.env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+        self.env["PYTHONPYCACHEPREFIX"] = tmp.name
+        self._run("-c", "import ast_repr_parser.batch, ast_repr_parser.daemon, ast_repr_parser.incremental")
+        self._run("run_ast_to_cangjie.py", "--help")
+
+    def test_lazy_package_import(self):
+        """import ast_repr_parser loads no submodule; parsing does not load codegen or compile regexes."""
+        show = "import sys; print(' '.join(sorted(m for m in sys.modules if m.startswith('ast_repr_parser'))))"
+        self.assertEqual(self._run("-c", "import ast_repr_parser; " + show).stdout.split(), ["ast_repr_parser"])
+        loaded = self._run("-c", "from ast_repr_parser import parse_ast_repr; " + show).stdout.split()
+        self.assertIn("ast_repr_parser.parser", loaded)
+        self.assertNotIn("ast_repr_parser.codegen", loaded)
+        # Regexes are compiled on first use
+        check = "import ast_repr_parser.parser as p; print(vars(p._LIST_START_RE).keys() - {'_args'})"
+        self.assertEqual(self._run("-c", check).stdout.strip(), "set()")
+
+    def test_import_budget(self):
+        """import ast_repr_parser and run_ast_to_cangjie.py --help stay within their -X importtime budgets."""
+        base = self._import_us("-c", "pass")
+        self.assertLessEqual(self._import_us("-c", "import ast_repr_parser") - base, IMPORT_BUDGET_US)
+        argparse_us = self._import_us("-c", "import argparse")
+        self.assertLessEqual(self._import_us("run_ast_to_cangjie.py", "--help") - argparse_us, CLI_HELP_BUDGET_US)
+
+
+class TestASTNode(unittest.TestCase):
+    """Compact node representation."""
+
+    def test_lazy_containers(self):
+        """Containers are created on first access and keep later mutations."""
+        from ast_repr_parser import ASTNode
+        node = ASTNode("RefExpr", "x")
+        self.assertIsNone(node.get("position"))
+        self.assertIsNone(node.get_position())
+        self.assertEqual(node.get("missing", 1), 1)
+        node.props["position"] = " (1, 2, 3) "
+        node.children.append(ASTNode("RefType"))
+        node.list_props["typeArguments"] = [ASTNode("PrimitiveType", "Int64")]
+        self.assertEqual(node.get_position(), "(1, 2, 3)")
+        self.assertEqual(node.get("typeArguments")[0].name, "Int64")
+        self.assertEqual(node, ASTNode("RefExpr", "x", props={"position": " (1, 2, 3) "},
+                                       children=[ASTNode("RefType")],
+                                       list_props={"typeArguments": [ASTNode("PrimitiveType", "Int64")]}))
+        self.assertNotEqual(node, ASTNode("RefExpr", "x"))
+        self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_per_node_memory(self):
+        """Parsed leaf nodes stay well below the ~450 bytes each of the former dataclass nodes."""
+        import io
+        import tracemalloc
+        n = 5000
+        text = "File: a {\n" + "RefExpr: x {\n}\n" * n + "}\n"
+        parse_ast_repr(io.StringIO(text))
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            root = parse_ast_repr(io.StringIO(text))
+            per_node = (tracemalloc.get_traced_memory()[0] - before) / n
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(len(root.children), n)
+        self.assertIs(root.children[0].type, root.children[-1].type)
+        self.assertLess(per_node, 200)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,314 @@
+"""
+Synthetic `cjc --dump-ast` style dumps for the benchmarks.
+Shapes follow the desugared dumps we convert (classes, handler-frame lambdas, nested blocks).
+"""
+
+import os
+import sys
+from typing import List
+
+# Allow importing ast_repr_parser from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _Out:
+    def __init__(self, unit: str = "  ") -> None:
+        self.unit = unit
+        self.lines: List[str] = []
+        self.depth = 0
+        self.line_no = 1
+
+    def line(self, text: str) -> None:
+        self.lines.append(self.unit * self.depth + text)
+
+    def open(self, head: str) -> None:
+        self.line(head + " {")
+        self.depth += 1
+
+    def open_list(self, key: str) -> None:
+        self.line(key + ": [")
+        self.depth += 1
+
+    def close(self) -> None:
+        self.depth -= 1
+        self.line("}")
+
+    def close_list(self) -> None:
+        self.depth -= 1
+        self.line("]")
+
+    def position(self) -> None:
+        n = self.line_no
+        self.line_no += 1
+        self.line(f"position: ({n}, 5, 1) ({n}, 40, 9)")
+
+
+def _ref_expr(o: _Out, name: str) -> None:
+    o.open(f"RefExpr: {name}")
+    o.position()
+    o.line("ty: Class-core:String")
+    o.close()
+
+
+def _lit(o: _Out, kind: str, value: str) -> None:
+    o.open(f'LitConstExpr: {kind} "{value}"')
+    o.position()
+    o.line(f"ty: Primitive-{kind}")
+    o.close()
+
+
+def _call(o: _Out, func: str, args: List[str]) -> None:
+    o.open("CallExpr")
+    o.position()
+    o.open("BaseFunc")
+    _ref_expr(o, func)
+    o.close()
+    o.open_list("arguments")
+    for a in args:
+        o.open("FuncArg")
+        _lit(o, "String", a)
+        o.close()
+    o.close_list()
+    o.close()
+
+
+def _ref_type(o: _Out, name: str, args: List[str]) -> None:
+    o.open(f"RefType: {name}")
+    o.line(f"ty: Class-{name}")
+    if args:
+        o.open_list("typeArguments")
+        for a in args:
+            o.open(f"PrimitiveType: {a}")
+            o.line(f"ty: {a}")
+            o.close()
+        o.close_list()
+    o.close()
+
+
+def _frame_lambda(o: _Out, idx: int) -> None:
+    o.open("VarDecl: let $frameLambda" + str(idx))
+    o.position()
+    o.line("ty: (Class-HandlerFrame) -> Unit  // desugared frame")
+    _ref_type(o, "Option", ["Int64"])
+    o.open("LambdaExpr")
+    o.position()
+    o.open("FuncBody")
+    o.open("FuncParamList")
+    o.open("FuncParam: frame")
+    _ref_type(o, "HandlerFrame", [])
+    o.close()
+    o.close()
+    o.open("Block")
+    _call(o, "println", [f"got here {idx}"])
+    o.open("AssignExpr")
+    o.position()
+    _ref_expr(o, "$handlerLambda")
+    _ref_expr(o, "frame")
+    o.close()
+    o.open("IfExpr")
+    o.position()
+    o.open("BinaryExpr: ==")
+    _ref_expr(o, "frame")
+    _lit(o, "Integer", str(idx))
+    o.close()
+    o.open("Block")
+    o.open("ReturnExpr")
+    _lit(o, "Unit", "()")
+    o.close()
+    o.close()
+    o.open("Block")
+    o.open("ThrowExpr")
+    _call(o, "Exception", ["unreachable"])
+    o.close()
+    o.close()
+    o.close()
+    o.close()
+    o.close()
+    o.close()
+    o.close()
+
+
+def _match_and_try(o: _Out) -> None:
+    o.open("MatchExpr")
+    o.position()
+    o.open("selector")
+    o.open("MemberAccess")
+    o.line("field: value")
+    _ref_expr(o, "frame")
+    o.close()
+    o.close()
+    o.open_list("matchCases")
+    o.open("MatchCase")
+    o.open("patterns")
+    o.open("TypePattern")
+    o.line("ty: Class-Some<Int64>")
+    o.open("VarPattern: v")
+    o.close()
+    o.close()
+    o.close()
+    o.open_list("exprOrDecls")
+    _call(o, "println", ["some"])
+    o.close_list()
+    o.close()
+    o.open("MatchCase")
+    o.open("patterns")
+    o.open("WildcardPattern: _")
+    o.close()
+    o.close()
+    o.open_list("exprOrDecls")
+    o.open("UnknowNode: *type")
+    o.line("kind: 7")
+    o.close()
+    o.close_list()
+    o.close()
+    o.close_list()
+    o.close()
+    o.open("TryExpr")
+    o.position()
+    o.open("TryBlock")
+    o.open("Block")
+    _call(o, "resume", [])
+    o.close()
+    o.close()
+    o.open("Catch")
+    o.open("CatchPattern")
+    o.open("ExceptTypePattern")
+    o.open("VarPattern: e")
+    o.close()
+    o.open("RefType: Exception")
+    o.close()
+    o.close()
+    o.close()
+    o.open("CatchBlock")
+    o.open("Block")
+    o.open("ThrowExpr")
+    _ref_expr(o, "e")
+    o.close()
+    o.close()
+    o.close()
+    o.close()
+    o.close()
+
+
+def _func_decl(o: _Out, name: str, n_stmts: int) -> None:
+    o.open(f"FuncDecl: {name}")
+    o.position()
+    o.open("FuncBody")
+    o.open("FuncParamList")
+    o.open("FuncParam: x")
+    o.open("PrimitiveType: Int64")
+    o.line("ty: Int64")
+    o.close()
+    o.close()
+    o.close()
+    o.open("PrimitiveType: Unit")
+    o.line("ty: Unit")
+    o.close()
+    o.open("Block")
+    for i in range(n_stmts):
+        _frame_lambda(o, i)
+    _match_and_try(o)
+    o.close()
+    o.close()
+    o.close()
+
+
+def synth_dump(n_classes: int, funcs_per_class: int = 4, stmts_per_func: int = 3) -> str:
+    """Return a File dump with `n_classes` classes of handler-frame boilerplate plus a main."""
+    o = _Out()
+    o.open("File: synth.cj")
+    o.line("curFile: synth.cj")
+    o.position()
+    o.open("PackageSpec: synth")
+    o.line("synth")
+    o.close()
+    o.open("ImportSpec: *")
+    o.line("prefixPaths: std.collection")
+    o.close()
+    for c in range(n_classes):
+        o.line(f"// class {c}")
+        o.open(f"ClassDecl: Frame{c}")
+        o.position()
+        o.open_list("inheritedTypes")
+        _ref_type(o, "HandlerFrame", [])
+        o.close_list()
+        o.open("ClassBody")
+        for f in range(funcs_per_class):
+            _func_decl(o, f"run{f}", stmts_per_func)
+        o.close()
+        o.close()
+    o.open("MainDecl: main")
+    o.position()
+    o.open("FuncDecl: main")
+    o.open("FuncBody")
+    o.open("Block")
+    _call(o, "println", ["done"])
+    o.close()
+    o.close()
+    o.close()
+    o.close()
+    o.close()
+    return "\n".join(o.lines) + "\n"
+
+
+def deep_dump(depth: int) -> str:
+    """Return a File dump whose main body is `depth` nested `Block`s around one call."""
+    o = _Out(unit="")
+    o.open("File: deep.cj")
+    o.position()
+    o.open("MainDecl: main")
+    o.open("FuncDecl: main")
+    o.open("FuncBody")
+    o.open("Block")
+    for _ in range(depth):
+        o.open("Block")
+        o.position()
+    _call(o, "println", ["deep"])
+    for _ in range(depth):
+        o.close()
+    o.close()
+    o.close()
+    o.close()
+    o.close()
+    o.close()
+    return "\n".join(o.lines) + "\n"
+
+
+def nested_if_assign_dump(depth: int) -> str:
+    """Return a File dump with `depth` levels of IfExpr -> Block -> AssignExpr -> Block nesting."""
+    o = _Out()
+    o.open("File: nested.cj")
+    o.open("MainDecl: main")
+    o.open("FuncDecl: main")
+    o.open("FuncBody")
+    o.open("Block")
+    for i in range(depth):
+        o.open("IfExpr")
+        o.position()
+        o.open("BinaryExpr: <")
+        _ref_expr(o, "i")
+        _lit(o, "Integer", str(i))
+        o.close()
+        o.open("Block")
+        o.open("AssignExpr")
+        o.position()
+        _ref_expr(o, f"x{i}")
+        o.open("Block")
+    _call(o, "println", ["innermost"])
+    for _ in range(depth):
+        o.close()
+        o.close()
+        o.close()
+        o.open("Block")
+        _call(o, "println", ["else"])
+        o.close()
+        o.close()
+    for _ in range(5):
+        o.close()
+    return "\n".join(o.lines) + "\n"
+
+
+def write_dump(path: str, text: str) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Per-node emitter dispatch: registry dict lookup vs. the former `if node.type == ...` chain.
+
+Usage: python3 benchmarks/bench_codegen_dispatch.py [--classes 100] [--repeat 5]
+"""
+
+import argparse
+import io
+import time
+
+from _synth import synth_dump
+
+from ast_repr_parser import ast_to_cangjie, parse_ast_repr
+from ast_repr_parser import codegen
+
+# Branch order of the former `_emit_expr`, which fell through to a KNOWN_NODE_TYPES check.
+_CHAIN = (
+    "RefExpr", "LitConstExpr", "CallExpr", "MemberAccess", "Block", "AssignExpr", "BinaryExpr",
+    "IfExpr", "MatchExpr", "ReturnExpr", "ThrowExpr", "LambdaExpr", "TryExpr", "UnknowNode",
+)
+_KNOWN = frozenset(codegen.KNOWN_NODE_TYPES)
+
+
+def _chain_dispatch(types) -> None:
+    # Reference copy of the comparison chain this benchmark compares against.
+    for t in types:
+        for branch in _CHAIN:
+            if t == branch:
+                break
+        else:
+            t in _KNOWN
+
+
+def _dict_dispatch(types) -> None:
+    get = codegen._EXPR_EMITTERS.get
+    default = codegen._emit_unknown_expr
+    for t in types:
+        get(t, default)
+
+
+def _node_types(root):
+    types, stack = [], [root]
+    while stack:
+        node = stack.pop()
+        types.append(node.type)
+        stack.extend(node.children)
+        for items in node.list_props.values():
+            stack.extend(e for e in items if hasattr(e, "type"))
+    return types
+
+
+def _best(fn, arg, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--classes", type=int, default=100)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    root = parse_ast_repr(io.StringIO(synth_dump(args.classes)))
+    types = _node_types(root)
+    n = len(types)
+    print(f"{n} nodes, {len(set(types))} node types")
+    chain = _best(_chain_dispatch, types, args.repeat)
+    table = _best(_dict_dispatch, types, args.repeat)
+    total = _best(ast_to_cangjie, root, args.repeat)
+    print(f"{'if-chain dispatch':<24} {chain / n * 1e9:>8.1f} ns/node")
+    print(f"{'registry dispatch':<24} {table / n * 1e9:>8.1f} ns/node  ({chain / table:.1f}x)")
+    print(f"{'ast_to_cangjie total':<24} {total / n * 1e9:>8.1f} ns/node")
+
+
+if __name__ == "__main__":
+    main()
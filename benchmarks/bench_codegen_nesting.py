@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Codegen work vs. depth of nested IfExpr/AssignExpr trees (should grow linearly).
+
+Usage: python3 benchmarks/bench_codegen_nesting.py [--depths 2 4 8 16 32 64] [--repeat 3]
+"""
+
+import argparse
+import io
+import time
+
+from _synth import nested_if_assign_dump
+
+from ast_repr_parser import ast_to_cangjie, parse_ast_repr
+from ast_repr_parser import codegen
+
+
+def _count_nodes(root) -> int:
+    n, stack = 0, [root]
+    while stack:
+        node = stack.pop()
+        n += 1
+        stack.extend(node.children)
+        for items in node.list_props.values():
+            stack.extend(items)
+    return n
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--depths", type=int, nargs="+", default=[2, 4, 8, 16, 32, 64])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    emit_expr = codegen._emit_expr
+    calls = 0
+
+    def counting_emit_expr(out, node, level):
+        nonlocal calls
+        calls += 1
+        return emit_expr(out, node, level)
+
+    print(f"{'depth':>6} {'nodes':>7} {'_emit_expr calls':>17} {'ms':>8}")
+    for depth in args.depths:
+        root = parse_ast_repr(io.StringIO(nested_if_assign_dump(depth)))
+        codegen._emit_expr = counting_emit_expr
+        calls = 0
+        try:
+            ast_to_cangjie(root)
+        finally:
+            codegen._emit_expr = emit_expr
+        best = float("inf")
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            ast_to_cangjie(root)
+            best = min(best, time.perf_counter() - t0)
+        print(f"{depth:>6} {_count_nodes(root):>7} {calls:>17} {best * 1e3:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
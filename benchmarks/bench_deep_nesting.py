@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Parse time of deeply nested dumps: explicit-stack parser vs. the former recursive one.
+
+Usage: python3 benchmarks/bench_deep_nesting.py [--depths 200 900 5000 50000] [--repeat 5]
+"""
+
+import argparse
+import io
+import sys
+import time
+
+from _synth import deep_dump
+from bench_tokenizer import _parse_line
+
+from ast_repr_parser import parse_ast_repr
+from ast_repr_parser.parser import LineReader, _make_node, _normalize_type_expr
+
+
+def _recursive_parse_node_content(reader: LineReader, node) -> None:
+    # Reference copy of the recursive `_parse_node_content` this benchmark compares against.
+    while True:
+        cur = reader.peek()
+        if cur is None:
+            return
+        kind = _parse_line(cur[2])
+        reader.consume()
+        if kind[0] == "close":
+            return
+        if kind[0] == "list_start":
+            key = kind[1]
+            node.list_props[key] = []
+            while True:
+                elem = reader.peek()
+                if elem is None:
+                    break
+                ek = _parse_line(elem[2])
+                reader.consume()
+                if ek[0] == "list_end":
+                    break
+                if ek[0] == "node":
+                    child = _make_node(ek[1], ek[2])
+                    node.list_props[key].append(child)
+                    _recursive_parse_node_content(reader, child)
+            continue
+        if kind[0] == "kv":
+            value = kind[2]
+            node.props[kind[1]] = _normalize_type_expr(value) if kind[1] == "ty" else value
+            continue
+        if kind[0] == "node":
+            child = _make_node(kind[1], kind[2])
+            node.children.append(child)
+            _recursive_parse_node_content(reader, child)
+
+
+def _recursive_parse(text: str) -> None:
+    with LineReader(io.StringIO(text)) as reader:
+        kind = _parse_line(reader.consume()[2])
+        _recursive_parse_node_content(reader, _make_node(kind[1], kind[2]))
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--depths", type=int, nargs="+", default=[200, 900, 5000, 50000])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"recursion limit: {sys.getrecursionlimit()}")
+    print(f"{'depth':>8} {'iterative ms':>13} {'recursive ms':>13}")
+    for depth in args.depths:
+        text = deep_dump(depth)
+        iterative = _best(lambda: parse_ast_repr(io.StringIO(text)), args.repeat)
+        try:
+            recursive = f"{_best(lambda: _recursive_parse(text), args.repeat) * 1e3:>13.1f}"
+        except RecursionError:
+            recursive = f"{'RecursionError':>13}"
+        print(f"{depth:>8} {iterative * 1e3:>13.1f} {recursive}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Time to regenerate after editing one class: full ast_to_cangjie vs. IncrementalCodegen.
+
+The edit changes one string literal in the middle class of the dump, so only that class is
+re-emitted. `full`/`incr` time codegen alone on an eagerly parsed tree; `full+parse` is
+parse_ast_repr plus ast_to_cangjie, and `lazy+parse` is parse_ast_repr(lazy=True) plus
+IncrementalCodegen, where the unchanged classes are digested from their dump text and never parsed
+(what `run_ast_to_cangjie.py --incremental` does).
+
+Usage: python3 benchmarks/bench_incremental.py [--classes 400] [--repeat 5]
+"""
+
+import argparse
+import io
+import os
+import tempfile
+import time
+
+from _synth import synth_dump
+
+from ast_repr_parser import ast_to_cangjie, parse_ast_repr
+from ast_repr_parser.incremental import IncrementalCodegen
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--classes", type=int, default=400)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    text = synth_dump(args.classes)
+    marker = f"// class {args.classes // 2}\n"
+    head, tail = text.split(marker)
+    edited = head + marker + tail.replace("got here 0", "got here 0 (edited)", 1)
+    before = parse_ast_repr(io.StringIO(text))
+    after = parse_ast_repr(io.StringIO(edited))
+    tmp = tempfile.mkdtemp()
+    paths = []
+    for name, dump in (("before.txt", text), ("after.txt", edited)):
+        paths.append(os.path.join(tmp, name))
+        with open(paths[-1], "w", encoding="utf-8") as f:
+            f.write(dump)
+    print(f"{'comments':<9} {'full ms':>8} {'incr ms':>8} {'full+parse ms':>14} {'lazy+parse ms':>14} {'emitted':>8}")
+    for comments in (False, True):
+        full = incr = eager = lazy = float("inf")
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            expected = ast_to_cangjie(after, include_comments=comments)
+            full = min(full, time.perf_counter() - t0)
+            gen = IncrementalCodegen(include_comments=comments)
+            gen.generate(before)
+            t0 = time.perf_counter()
+            out = gen.generate(after)
+            incr = min(incr, time.perf_counter() - t0)
+            assert out == expected
+            t0 = time.perf_counter()
+            ast_to_cangjie(parse_ast_repr(paths[1]), include_comments=comments)
+            eager = min(eager, time.perf_counter() - t0)
+            gen = IncrementalCodegen(include_comments=comments)
+            gen.generate(parse_ast_repr(paths[0], lazy=True))
+            t0 = time.perf_counter()
+            out = gen.generate(parse_ast_repr(paths[1], lazy=True))
+            lazy = min(lazy, time.perf_counter() - t0)
+            assert out == expected
+        print(f"{str(comments):<9} {full * 1e3:>8.1f} {incr * 1e3:>8.1f} {eager * 1e3:>14.1f} {lazy * 1e3:>14.1f} {gen.emitted:>8}")
+
+
+if __name__ == "__main__":
+    main()
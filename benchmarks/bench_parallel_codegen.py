@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Wall time of parse + ast_to_cangjie on one large File dump, sequential vs. workers=N.
+
+With workers, the dump is opened lazily and each worker parses and emits its own top-level
+declarations (what `run_ast_to_cangjie.py -j N` does).
+
+Usage: python3 benchmarks/bench_parallel_codegen.py [--classes 400] [--workers 1 2 4 8]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from _synth import synth_dump, write_dump
+
+from ast_repr_parser import ast_to_cangjie, parse_ast_repr
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--classes", type=int, default=400)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_dump(os.path.join(tmp, "dump.txt"), synth_dump(args.classes))
+        print(f"{os.path.getsize(path) / 1e6:.1f} MB dump, {os.cpu_count()} CPUs")
+        print(f"{'workers':>8} {'seconds':>8} {'speedup':>8}")
+        base = None
+        expected = None
+        for n in args.workers:
+            t0 = time.perf_counter()
+            out = ast_to_cangjie(parse_ast_repr(path, lazy=n > 1), workers=n)
+            elapsed = time.perf_counter() - t0
+            expected = expected or out
+            assert out == expected, "parallel output differs"
+            base = base or elapsed
+            print(f"{n:>8} {elapsed:>8.2f} {base / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
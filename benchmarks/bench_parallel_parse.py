@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Wall time of parse_ast_repr(path, workers=N) on one large File dump.
+
+Usage: python3 benchmarks/bench_parallel_parse.py [--classes 400] [--workers 1 2 4 8]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from _synth import synth_dump, write_dump
+
+from ast_repr_parser import parse_ast_repr
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--classes", type=int, default=400)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_dump(os.path.join(tmp, "dump.txt"), synth_dump(args.classes))
+        print(f"{os.path.getsize(path) / 1e6:.1f} MB dump, {os.cpu_count()} CPUs")
+        print(f"{'workers':>8} {'seconds':>8} {'speedup':>8}")
+        base = None
+        for n in args.workers:
+            t0 = time.perf_counter()
+            parse_ast_repr(path, workers=n)
+            elapsed = time.perf_counter() - t0
+            base = base or elapsed
+            print(f"{n:>8} {elapsed:>8.2f} {base / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
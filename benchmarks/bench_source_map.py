@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""Codegen time and output size: inline position comments vs. no comments vs. a source map.
+
+Usage: python3 benchmarks/bench_source_map.py [--classes 100] [--repeat 5]
+"""
+
+import argparse
+import io
+import time
+
+from _synth import synth_dump
+
+from ast_repr_parser import ast_to_cangjie, parse_ast_repr
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--classes", type=int, default=100)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    root = parse_ast_repr(io.StringIO(synth_dump(args.classes)))
+    modes = {
+        "position comments": lambda: (ast_to_cangjie(root), None),
+        "no comments": lambda: (ast_to_cangjie(root, include_comments=False), None),
+        "source map": lambda: (lambda sm: (ast_to_cangjie(root, source_map=sm), sm))([]),
+    }
+    print(f"{'mode':<20} {'ms':>8} {'output KB':>10} {'map entries':>12}")
+    for label, run in modes.items():
+        best = float("inf")
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            text, entries = run()
+            best = min(best, time.perf_counter() - t0)
+        n = "" if entries is None else len(entries)
+        print(f"{label:<20} {best * 1e3:>8.1f} {len(text) / 1e3:>10.1f} {n:>12}")
+
+
+if __name__ == "__main__":
+    main()
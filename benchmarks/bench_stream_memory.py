@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Peak memory of reading a dump through LineReader, streamed vs. fully materialized.
+
+Usage: python3 benchmarks/bench_stream_memory.py [--sizes 50 200 800]
+"""
+
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+from _synth import synth_dump, write_dump
+
+from ast_repr_parser.parser import LineReader
+
+
+def _peak(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _drain_streaming(path: str) -> None:
+    with LineReader(path) as reader:
+        while reader.consume() is not None:
+            pass
+
+
+def _drain_materialized(path: str) -> None:
+    # What LineReader used to do: hold every (indent, content, stripped) tuple at once.
+    with LineReader(path) as reader:
+        lines = []
+        while not reader.at_end():
+            lines.append(reader.consume())
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 800], help="Number of classes per dump")
+    args = ap.parse_args()
+
+    print(f"{'classes':>8} {'file MB':>8} {'streamed KB':>12} {'materialized KB':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            path = write_dump(os.path.join(tmp, f"dump{n}.txt"), synth_dump(n))
+            size = os.path.getsize(path)
+            streamed = _peak(lambda: _drain_streaming(path))
+            materialized = _peak(lambda: _drain_materialized(path))
+            print(f"{n:>8} {size / 1e6:>8.1f} {streamed / 1024:>12.1f} {materialized / 1024:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Lines/sec of the fused `_tokenize_line` vs. `_strip_comment` + `_parse_line`.
+
+Usage: python3 benchmarks/bench_tokenizer.py [--classes 100] [--repeat 5]
+"""
+
+import argparse
+import re
+import time
+
+from _synth import synth_dump
+
+from ast_repr_parser.parser import _node_token, _tokenize_line
+
+
+def _strip_comment(line: str) -> str:
+    # Reference copy of the former two-pass tokenizer (with _parse_line) this benchmark compares against.
+    i = 0
+    while i < len(line):
+        if line[i:i+2] == "//":
+            return line[:i].rstrip()
+        if line[i] == '"':
+            i += 1
+            while i < len(line) and line[i] != '"':
+                if line[i] == "\\":
+                    i += 1
+                i += 1
+            i += 1
+            continue
+        i += 1
+    return line
+
+
+_LIST_COLON_RE = re.compile(r"^([A-Za-z][A-Za-z0-9_]*)\s*:\s*\[\s*$")
+_LIST_SPACE_RE = re.compile(r"^([A-Za-z][A-Za-z0-9_]*)\s+\[\s*$")
+
+
+def _parse_line(line: str) -> tuple:
+    stripped = line.strip()
+    if not stripped or stripped.startswith("//"):
+        return ("comment",)
+    if stripped == "}":
+        return ("close",)
+    if stripped == "]":
+        return ("list_end",)
+    m = _LIST_COLON_RE.match(stripped)
+    if m:
+        return ("list_start", m.group(1))
+    m = _LIST_SPACE_RE.match(stripped)
+    if m:
+        return ("list_start", m.group(1))
+    if stripped.endswith(" {"):
+        return _node_token(stripped[:-2].rstrip())
+    if ": " in stripped:
+        idx = stripped.index(": ")
+        key = stripped[:idx].strip()
+        value = stripped[idx+2:].strip()
+        return ("kv", key, value)
+    return ("comment",)
+
+
+def _two_pass(lines):
+    for line in lines:
+        _parse_line(_strip_comment(line).strip())
+
+
+def _fused(lines):
+    for line in lines:
+        _tokenize_line(line)
+
+
+def _best(fn, lines, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(lines)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--classes", type=int, default=100)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    lines = synth_dump(args.classes).splitlines()
+    with_comment = sum("//" in line for line in lines)
+    print(f"{len(lines)} lines ({with_comment} with '//')")
+    old = _best(_two_pass, lines, args.repeat)
+    new = _best(_fused, lines, args.repeat)
+    print(f"{'_strip_comment + _parse_line':<30} {len(lines) / old:>12,.0f} lines/s")
+    print(f"{'_tokenize_line':<30} {len(lines) / new:>12,.0f} lines/s  ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
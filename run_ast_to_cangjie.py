@@ -5,10 +5,73 @@ import argparse
 import os
 import sys
 
-# Allow importing ast_repr_parser from this directory
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# ast_repr_parser modules are imported once the arguments are parsed, and only those the mode
+# needs, so `--help`, usage errors and `--daemon` requests start quickly.
 
-from ast_repr_parser import parse_ast_repr, ast_to_cangjie
+
+def run_batch(jobs, args):
+    """Convert `jobs` into args.out_dir, reporting each file and the totals on stderr; 1 if any failed."""
+    import time
+    from ast_repr_parser.batch import Manifest, convert_many
+
+    t0 = time.perf_counter()
+    total = failed = skipped = 0
+    for result in convert_many(
+        jobs,
+        args.out_dir,
+        workers=args.workers,
+        manifest=Manifest(args.manifest) if args.manifest else None,
+        include_comments=not args.no_comments,
+        sanitize_identifiers=args.round_trip,
+        round_trip=args.round_trip,
+    ):
+        if result.skipped:
+            skipped += 1
+            continue
+        if result.error:
+            failed += 1
+            print(f"{result.input}: {result.error}", file=sys.stderr)
+            continue
+        total += result.size
+        print(
+            f"{result.input} -> {result.output}: {result.size / 1e6:.2f} MB in {result.seconds * 1e3:.1f} ms "
+            f"({result.size / 1e6 / max(result.seconds, 1e-9):.1f} MB/s)",
+            file=sys.stderr,
+        )
+    elapsed = time.perf_counter() - t0
+    print(
+        f"{len(jobs)} files ({skipped} unchanged, {failed} failed), {total / 1e6:.2f} MB in {elapsed:.2f} s: "
+        f"{len(jobs) / max(elapsed, 1e-9):.1f} files/s, {total / 1e6 / max(elapsed, 1e-9):.1f} MB/s",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
+def run_stream(args):
+    """Convert the dump on stdin, writing each top-level declaration as soon as it has been read."""
+    from ast_repr_parser import iter_cangjie_stream, parse_ast_stream
+    from ast_repr_parser.codegen import write_source_map
+
+    source_map = [] if args.source_map else None
+    pieces = iter_cangjie_stream(
+        parse_ast_stream(sys.stdin.buffer),
+        include_comments=not args.no_comments,
+        sanitize_identifiers=args.round_trip,
+        round_trip=args.round_trip,
+        source_map=source_map,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for piece in pieces:
+                f.write(piece)
+    else:
+        for piece in pieces:
+            sys.stdout.write(piece)
+            sys.stdout.flush()
+        sys.stdout.write("\n")
+    if args.source_map:
+        with open(args.source_map, "w", encoding="utf-8") as f:
+            write_source_map(source_map, f, args.output)
 
 
 def main():
@@ -20,9 +83,10 @@ def main():
     )
     parser.add_argument(
         "input",
-        nargs="?",
-        default=default_path,
-        help=f"Path to the AST repr text file (default: {default_path})",
+        nargs="*",
+        default=[default_path],
+        help=f"Path to the AST repr text file, or - to stream from stdin (default: {default_path}); "
+        "with --out-dir, any number of files, directories or globs",
     )
     parser.add_argument(
         "--no-comments",
@@ -34,27 +98,159 @@ def main():
         action="store_true",
         help="Round-trip identifier spelling by replacing '-' with '__' and '$' with 'dollar_'",
     )
+    parser.add_argument(
+        "--source-map",
+        metavar="FILE",
+        help="Write a source map (output line/column -> AST position) to FILE instead of position comments",
+    )
+    parser.add_argument(
+        "-j", "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Parse and emit top-level declarations in N worker processes (same output); "
+        "with --out-dir, convert N dumps at a time",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Re-emit only the top-level declarations that changed since the last run with -o FILE "
+        "(state kept in FILE.cjinc; same output)",
+    )
     parser.add_argument(
         "-o", "--output",
         metavar="FILE",
         help="Write output to FILE instead of stdout",
     )
+    parser.add_argument(
+        "--out-dir",
+        metavar="DIR",
+        help="Batch mode: convert every input dump to DIR, mirroring its relative path with a .cj suffix",
+    )
+    parser.add_argument(
+        "--pattern",
+        help="File name pattern for dumps in input directories (default: *.txt)",
+    )
+    parser.add_argument(
+        "--manifest",
+        metavar="FILE",
+        help="With --out-dir: record input/output hashes and options in FILE and skip dumps converted "
+        "unchanged with the same options by an earlier run",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run as a daemon serving conversions on the --socket Unix socket until interrupted",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Convert through the daemon on --socket when one is running, else convert here",
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="Daemon socket path (default: $AST_REPR_SOCKET, else ast_repr_parser.sock in $XDG_RUNTIME_DIR, "
+        "else daemon.sock in a private /tmp/ast_repr_parser-<uid> directory)",
+    )
     args = parser.parse_args()
 
+    # Allow importing ast_repr_parser from this directory
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    if args.serve:
+        from ast_repr_parser.daemon import default_socket_path, serve
+
+        print(f"Serving on {args.socket or default_socket_path()}", file=sys.stderr)
+        try:
+            serve(args.socket)
+        except OSError as e:
+            parser.error(str(e))
+        return
+    if args.manifest and not args.out_dir:
+        parser.error("--manifest needs --out-dir")
+    if args.out_dir:
+        for flag, given in (("-o", args.output), ("--source-map", args.source_map), ("--incremental", args.incremental)):
+            if given:
+                parser.error(f"{flag} cannot be combined with --out-dir")
+        from ast_repr_parser.batch import DEFAULT_PATTERN, expand_inputs
+        try:
+            jobs = expand_inputs(args.input, args.pattern or DEFAULT_PATTERN)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        sys.exit(run_batch(jobs, args))
+    if len(args.input) > 1:
+        parser.error("several inputs need --out-dir")
+    args.input = args.input[0]
+    if args.input == "-":
+        for flag, given in (("--incremental", args.incremental), ("--daemon", args.daemon), ("-j", args.workers > 1)):
+            if given:
+                parser.error(f"{flag} cannot be combined with reading stdin")
+        run_stream(args)
+        return
     if not os.path.isfile(args.input):
         parser.error(f"File not found: {args.input}")
-    root = parse_ast_repr(args.input)
-    out = ast_to_cangjie(
-        root,
+    if args.incremental and not args.output:
+        parser.error("--incremental needs -o FILE")
+    if args.incremental and args.source_map:
+        parser.error("--incremental cannot be combined with --source-map")
+    if args.daemon:
+        for flag, given in (("--source-map", args.source_map), ("--incremental", args.incremental), ("-j", args.workers > 1)):
+            if given:
+                parser.error(f"{flag} cannot be combined with --daemon")
+        from ast_repr_parser.daemon import DaemonClient
+        try:
+            client = DaemonClient.connect(args.socket)
+        except PermissionError as e:
+            parser.error(str(e))
+        if client is not None:
+            with client:
+                text = client.convert(
+                    args.input,
+                    include_comments=not args.no_comments,
+                    sanitize_identifiers=args.round_trip,
+                    round_trip=args.round_trip,
+                )
+            if args.output:
+                with open(args.output, "w", encoding="utf-8") as f:
+                    f.write(text)
+            else:
+                sys.stdout.write(text + "\n")
+            return
+    from ast_repr_parser import parse_ast_repr, write_cangjie
+    if args.incremental:
+        from ast_repr_parser.incremental import IncrementalCodegen
+        # Unchanged declarations are spliced from the previous output instead of being regenerated
+        gen = IncrementalCodegen(
+            args.output + ".cjinc",
+            include_comments=not args.no_comments,
+            sanitize_identifiers=args.round_trip,
+            round_trip=args.round_trip,
+        )
+        # Lazy, so the declarations that did not change are never parsed
+        text = gen.generate(parse_ast_repr(args.input, lazy=True))
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        return
+    from ast_repr_parser.codegen import write_source_map
+    # With workers, only the top-level layout is scanned here; each worker parses its own declarations
+    root = parse_ast_repr(args.input, lazy=args.workers > 1)
+    options = dict(
         include_comments=not args.no_comments,
         sanitize_identifiers=args.round_trip,
         round_trip=args.round_trip,
+        workers=args.workers,
+        source_map=[] if args.source_map else None,
     )
+    # Each top-level declaration is written as soon as it is generated
     if args.output:
         with open(args.output, "w", encoding="utf-8") as f:
-            f.write(out)
+            write_cangjie(root, f, **options)
     else:
-        print(out)
+        write_cangjie(root, sys.stdout, **options)
+        sys.stdout.write("\n")
+    if args.source_map:
+        with open(args.source_map, "w", encoding="utf-8") as f:
+            write_source_map(options["source_map"], f, args.output)
 
 
 if __name__ == "__main__":